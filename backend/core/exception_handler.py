@@ -1,5 +1,5 @@
 from fastapi import Request, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from fastapi.exceptions import RequestValidationError
 from sqlalchemy.exc import SQLAlchemyError
 import logging
@@ -15,7 +15,7 @@ async def global_exception_handler(request: Request, exc: Exception):
     """Global exception handler for all unhandled exceptions"""
     logger.error(f"Unhandled exception: {exc}", exc_info=True)
     
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=500,
         content={
             "success": False,
@@ -26,7 +26,7 @@ async def global_exception_handler(request: Request, exc: Exception):
 
 async def custom_api_exception_handler(request: Request, exc: CustomAPIException):
     """Handler for custom API exceptions"""
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=exc.status_code,
         content={
             "success": False,
@@ -37,7 +37,7 @@ async def custom_api_exception_handler(request: Request, exc: CustomAPIException
 
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
     """Handler for validation errors"""
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=422,
         content={
             "success": False,
@@ -48,7 +48,7 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
 
 async def http_exception_handler(request: Request, exc: HTTPException):
     """Handler for HTTP exceptions"""
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=exc.status_code,
         content={
             "success": False,
@@ -61,7 +61,7 @@ async def sqlalchemy_exception_handler(request: Request, exc: SQLAlchemyError):
     """Handler for database errors"""
     logger.error(f"Database error: {exc}", exc_info=True)
     
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=500,
         content={
             "success": False,
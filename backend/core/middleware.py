@@ -0,0 +1,17 @@
+from typing import Iterable
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+class SelectiveGZipMiddleware:
+    """지정한 경로를 제외하고 gzip 압축 (SSE 스트림은 압축 버퍼링 없이 그대로 전달)"""
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 500, exclude_paths: Iterable[str] = ()):
+        self.app = app
+        self.gzip_app = GZipMiddleware(app, minimum_size=minimum_size)
+        self.exclude_paths = frozenset(exclude_paths)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] == "http" and scope["path"] in self.exclude_paths:
+            await self.app(scope, receive, send)
+        else:
+            await self.gzip_app(scope, receive, send)
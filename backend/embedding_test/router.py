@@ -1,22 +1,133 @@
 from fastapi import APIRouter, Depends, UploadFile, File
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
 from pydantic import BaseModel
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple, Callable, Awaitable
+from collections import OrderedDict
+import asyncio
 import uuid
+import faiss
 import io
 from pathlib import Path
-import PyPDF2
+import pypdfium2 as pdfium
 from docx import Document
 
-from db.database import get_db
-from db.models import EmbeddingTest as EmbeddingTestModel
+from db.database import get_db, get_async_db
+from db.models import EmbeddingTest as EmbeddingTestModel, EmbeddingTestResult as EmbeddingTestResultModel
+from backend.retrieval.chunking import chunk_text
+from backend.retrieval import get_vector_search
 from backend.retrieval.vector_search import VectorSearch
 from backend.config import settings
 from backend.core.exception_handler import CustomAPIException
 
 router = APIRouter(prefix="/embedding-test", tags=["embedding-test"])
 
-vector_search = VectorSearch()
+# 샘플 문서들 (테스트용)
+SAMPLE_DOCUMENTS = [
+    "인공지능은 컴퓨터 시스템이 인간의 지능을 모방하여 학습하고 추론하는 기술입니다.",
+    "머신러닝은 데이터로부터 패턴을 학습하여 예측이나 분류를 수행하는 AI의 한 분야입니다.",
+    "딥러닝은 신경망을 사용하여 복잡한 패턴을 학습하는 머신러닝의 하위 분야입니다.",
+    "자연어처리는 인간의 언어를 컴퓨터가 이해하고 처리할 수 있도록 하는 기술입니다.",
+    "컴퓨터 비전은 이미지나 비디오에서 의미 있는 정보를 추출하는 AI 기술입니다."
+]
+
+# 저장되는 문서/검색 결과 내용의 최대 길이
+CONTENT_PREVIEW_LENGTH = 500
+
+# 모델별 샘플 문서 FAISS 인덱스와 (질문, 모델)별 검색 결과 캐시
+_sample_indexes: Dict[str, faiss.Index] = {}
+_sample_results: "OrderedDict[Tuple[str, str, int], List[Dict[str, Any]]]" = OrderedDict()
+
+async def _get_sample_index(vector_search: VectorSearch, model_name: str) -> faiss.Index:
+    """샘플 문서 인덱스 조회 (모델별 최초 요청 시 한 번만 임베딩)"""
+    index = _sample_indexes.get(model_name)
+    if index is None:
+        embeddings = await vector_search.batcher.encode(SAMPLE_DOCUMENTS, model_name)
+        index = _sample_indexes[model_name] = vector_search.build_faiss_index(embeddings, model_name)
+    return index
+
+async def search_sample_documents(vector_search: VectorSearch, question: str, model_name: str,
+                                  top_k: int = 3) -> List[Dict[str, Any]]:
+    """샘플 문서 검색 (동일한 질문은 캐시된 결과 반환)"""
+    key = (question, model_name, top_k)
+    if key in _sample_results:
+        _sample_results.move_to_end(key)
+        return _sample_results[key]
+    
+    index = await _get_sample_index(vector_search, model_name)
+    results = await vector_search.asearch_faiss(
+        documents=SAMPLE_DOCUMENTS,
+        query=question,
+        model_name=model_name,
+        top_k=top_k,
+        index=index
+    )
+    
+    _sample_results[key] = results
+    if len(_sample_results) > settings.SAMPLE_RESULT_CACHE_SIZE:
+        _sample_results.popitem(last=False)
+    return results
+
+async def run_model_tests(
+    vector_search: VectorSearch,
+    model_names: List[str],
+    search: Callable[[str], Awaitable[List[Dict[str, Any]]]]
+) -> Dict[str, Dict[str, Any]]:
+    """모델별 검색을 동시에 실행하고 {status, results|error} 형식으로 정리"""
+    available_models = [m for m in model_names if m in vector_search.embedding_generator.models]
+    outcomes = await asyncio.gather(*(search(m) for m in available_models), return_exceptions=True)
+    outcomes = dict(zip(available_models, outcomes))
+    
+    results = {}
+    for model_name in model_names:
+        if model_name not in outcomes:
+            results[model_name] = {
+                "status": "error",
+                "error": f"Model {model_name} not available"
+            }
+        elif isinstance(outcomes[model_name], Exception):
+            results[model_name] = {
+                "status": "error",
+                "error": str(outcomes[model_name])
+            }
+        else:
+            results[model_name] = {
+                "status": "success",
+                "results": outcomes[model_name]
+            }
+    return results
+
+def save_test_results(
+    db: Session,
+    question: str,
+    results: Dict[str, Dict[str, Any]],
+    content: Optional[str] = None
+) -> EmbeddingTestModel:
+    """테스트 기록과 모델별 결과 행 저장 (문서 내용은 미리보기로 축약)"""
+    test_record = EmbeddingTestModel(
+        id=uuid.uuid4(),
+        model_name="multiple",
+        question=question,
+        content_preview=content[:CONTENT_PREVIEW_LENGTH] if content else None
+    )
+    db.add(test_record)
+    db.flush()  # 결과 행의 외래 키보다 먼저 테스트 기록 삽입
+    db.add_all([
+        EmbeddingTestResultModel(
+            test_id=test_record.id,
+            model_name=model_name,
+            status=result["status"],
+            top_k_json=[
+                dict(item, content=item["content"][:CONTENT_PREVIEW_LENGTH])
+                for item in result.get("results", [])
+            ] if result["status"] == "success" else None,
+            error=result.get("error")
+        )
+        for model_name, result in results.items()
+    ])
+    db.commit()
+    return test_record
 
 class TestRequest(BaseModel):
     question: str
@@ -26,17 +137,16 @@ def extract_text_from_file(file_content: bytes, file_extension: str) -> str:
     """파일에서 텍스트 추출"""
     try:
         if file_extension == ".pdf":
-            pdf_reader = PyPDF2.PdfReader(io.BytesIO(file_content))
-            text = ""
-            for page in pdf_reader.pages:
-                text += page.extract_text() + "\n"
-            return text.strip()
+            # pdfium(C++) 기반 추출, 페이지 텍스트는 리스트로 모아 한 번에 결합
+            pdf = pdfium.PdfDocument(file_content)
+            try:
+                parts = [pdf[i].get_textpage().get_text_range() for i in range(len(pdf))]
+            finally:
+                pdf.close()
+            return "\n".join(parts).strip()
         elif file_extension == ".docx":
             doc = Document(io.BytesIO(file_content))
-            text = ""
-            for paragraph in doc.paragraphs:
-                text += paragraph.text + "\n"
-            return text.strip()
+            return "\n".join(paragraph.text for paragraph in doc.paragraphs).strip()
         else:
             raise CustomAPIException("지원하지 않는 파일 형식입니다.")
     except Exception as e:
@@ -47,7 +157,8 @@ async def test_embedding_with_file(
     file: UploadFile = File(...),
     question: str = None,
     model_names: List[str] = None,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    vector_search: VectorSearch = Depends(get_vector_search)
 ):
     """파일을 업로드하여 임베딩 모델 성능 테스트"""
     try:
@@ -60,11 +171,17 @@ async def test_embedding_with_file(
         
         # 파일 검증
         file_extension = Path(file.filename).suffix.lower()
-        if file_extension not in settings.ALLOWED_EXTENSIONS:
+        if file_extension not in settings.ALLOWED_EXTENSIONS_SET:
             raise CustomAPIException(
                 f"지원하지 않는 파일 형식입니다. 지원 형식: {', '.join(settings.ALLOWED_EXTENSIONS)}"
             )
         
+        # 파일 크기 검증 (읽기 전에 알려진 크기로 먼저 확인)
+        if file.size is not None and file.size > settings.MAX_FILE_SIZE:
+            raise CustomAPIException(
+                f"파일 크기가 너무 큽니다. 최대 크기: {settings.MAX_FILE_SIZE // (1024*1024)}MB"
+            )
+        
         # 파일 읽기
         file_content = await file.read()
         if len(file_content) > settings.MAX_FILE_SIZE:
@@ -77,46 +194,23 @@ async def test_embedding_with_file(
         if not content.strip():
             raise CustomAPIException("파일에서 텍스트를 추출할 수 없습니다.")
         
-        # 문서를 문장 단위로 분할 (간단한 분할)
-        sentences = [s.strip() for s in content.split('.') if s.strip()]
-        if len(sentences) < 3:
-            sentences = [content]  # 문장이 적으면 전체를 하나로
+        # 문서를 토큰 윈도우 단위 청크로 분할 (최대 MAX_CHUNKS_PER_TEST개)
+        chunks = chunk_text(content)
         
-        # 각 모델별로 FAISS 검색 수행
-        results = {}
-        for model_name in model_names:
-            try:
-                if model_name in vector_search.embedding_generator.models:
-                    faiss_results = vector_search.search_faiss(
-                        documents=sentences,
-                        query=question,
-                        model_name=model_name,
-                        top_k=3
-                    )
-                    results[model_name] = {
-                        "status": "success",
-                        "results": faiss_results
-                    }
-                else:
-                    results[model_name] = {
-                        "status": "error",
-                        "error": f"Model {model_name} not available"
-                    }
-            except Exception as e:
-                results[model_name] = {
-                    "status": "error",
-                    "error": str(e)
-                }
-        
-        # 테스트 결과 저장
-        test_record = EmbeddingTestModel(
-            id=uuid.uuid4(),
-            model_name="multiple",
-            question=question,
-            topk_results=results
+        # 각 모델별로 FAISS 검색을 동시에 수행
+        results = await run_model_tests(
+            vector_search,
+            model_names,
+            lambda model_name: vector_search.asearch_faiss(
+                documents=chunks,
+                query=question,
+                model_name=model_name,
+                top_k=3
+            )
         )
-        db.add(test_record)
-        db.commit()
+        
+        # 테스트 결과 저장 (동기 세션 커밋이 이벤트 루프를 막지 않도록 스레드에서 실행)
+        test_record = await asyncio.to_thread(save_test_results, db, question, results, content)
         
         return {
             "success": True,
@@ -139,54 +233,25 @@ async def test_embedding_with_file(
 @router.post("/test-with-text")
 async def test_embedding_with_text(
     request: TestRequest,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    vector_search: VectorSearch = Depends(get_vector_search)
 ):
     """텍스트를 직접 입력하여 임베딩 모델 성능 테스트"""
     try:
-        # 샘플 문서들 (테스트용)
-        sample_documents = [
-            "인공지능은 컴퓨터 시스템이 인간의 지능을 모방하여 학습하고 추론하는 기술입니다.",
-            "머신러닝은 데이터로부터 패턴을 학습하여 예측이나 분류를 수행하는 AI의 한 분야입니다.",
-            "딥러닝은 신경망을 사용하여 복잡한 패턴을 학습하는 머신러닝의 하위 분야입니다.",
-            "자연어처리는 인간의 언어를 컴퓨터가 이해하고 처리할 수 있도록 하는 기술입니다.",
-            "컴퓨터 비전은 이미지나 비디오에서 의미 있는 정보를 추출하는 AI 기술입니다."
-        ]
-        
-        # 각 모델별로 FAISS 검색 수행
-        results = {}
-        for model_name in request.model_names:
-            try:
-                if model_name in vector_search.embedding_generator.models:
-                    faiss_results = vector_search.search_faiss(
-                        documents=sample_documents,
-                        query=request.question,
-                        model_name=model_name,
-                        top_k=3
-                    )
-                    results[model_name] = {
-                        "status": "success",
-                        "results": faiss_results
-                    }
-                else:
-                    results[model_name] = {
-                        "status": "error",
-                        "error": f"Model {model_name} not available"
-                    }
-            except Exception as e:
-                results[model_name] = {
-                    "status": "error",
-                    "error": str(e)
-                }
-        
-        # 테스트 결과 저장
-        test_record = EmbeddingTestModel(
-            id=uuid.uuid4(),
-            model_name="multiple",
-            question=request.question,
-            topk_results=results
+        # 각 모델별로 FAISS 검색을 동시에 수행 (샘플 문서 임베딩은 모델별로 한 번만 계산)
+        results = await run_model_tests(
+            vector_search,
+            request.model_names,
+            lambda model_name: search_sample_documents(
+                vector_search,
+                question=request.question,
+                model_name=model_name,
+                top_k=3
+            )
         )
-        db.add(test_record)
-        db.commit()
+        
+        # 테스트 결과 저장 (동기 세션 커밋이 이벤트 루프를 막지 않도록 스레드에서 실행)
+        test_record = await asyncio.to_thread(save_test_results, db, request.question, results)
         
         return {
             "success": True,
@@ -203,7 +268,7 @@ async def test_embedding_with_text(
         raise CustomAPIException(f"임베딩 테스트 중 오류가 발생했습니다: {str(e)}")
 
 @router.get("/available-models")
-async def get_available_models():
+async def get_available_models(vector_search: VectorSearch = Depends(get_vector_search)):
     """사용 가능한 임베딩 모델 목록 조회"""
     try:
         available_models = list(vector_search.embedding_generator.models.keys())
@@ -234,12 +299,18 @@ async def get_available_models():
         raise CustomAPIException(f"모델 목록 조회 중 오류가 발생했습니다: {str(e)}")
 
 @router.get("/history")
-async def get_test_history(db: Session = Depends(get_db)):
+async def get_test_history(db: AsyncSession = Depends(get_async_db)):
     """임베딩 테스트 히스토리 조회"""
     try:
-        tests = db.query(EmbeddingTestModel).order_by(
-            EmbeddingTestModel.created_at.desc()
-        ).limit(20).all()
+        # 결과 JSON 컬럼을 제외하고 목록에 필요한 컬럼만 조회
+        tests = (await db.execute(
+            select(
+                EmbeddingTestModel.id,
+                EmbeddingTestModel.model_name,
+                EmbeddingTestModel.question,
+                EmbeddingTestModel.created_at
+            ).order_by(EmbeddingTestModel.created_at.desc()).limit(20)
+        )).all()
         
         history = []
         for test in tests:
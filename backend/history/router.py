@@ -1,52 +1,123 @@
 from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
-from typing import Optional, List
-from datetime import datetime, timedelta
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, delete, func, case, tuple_, true, JSON
+from sqlalchemy.sql import Select
+from typing import Optional, List, Tuple
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+import uuid
+import ciso8601
 
-from db.database import get_db
-from db.models import Document as DocumentModel, Query as QueryModel, Answer as AnswerModel
+from db.database import get_async_db
+from db.models import Document as DocumentModel, Query as QueryModel, Answer as AnswerModel, QACache as QACacheModel
 from backend.core.exception_handler import CustomAPIException
+from backend.qa.semantic_cache import semantic_cache
 
 router = APIRouter(prefix="/history", tags=["history"])
 
+@lru_cache(maxsize=1024)
+def _parse_iso(value: str) -> datetime:
+    """ISO 8601 문자열 파싱 (대시보드의 반복 필터 값은 캐시)"""
+    return ciso8601.parse_datetime(value)
+
+def _parse_cursor(after_date: Optional[str], after_id: Optional[str]) -> Tuple[datetime, uuid.UUID]:
+    """페이지네이션 커서 (정렬 시각, id) 파싱"""
+    if not (after_date and after_id):
+        raise CustomAPIException("커서에는 시각과 id가 모두 필요합니다.")
+    try:
+        return _parse_iso(after_date), uuid.UUID(after_id)
+    except ValueError:
+        raise CustomAPIException("잘못된 커서 형식입니다.")
+
+def _parse_id(value: str, message: str) -> uuid.UUID:
+    """경로 파라미터 UUID 파싱"""
+    try:
+        return uuid.UUID(value)
+    except ValueError:
+        raise CustomAPIException(message)
+
+async def _count(db: AsyncSession, stmt: Select) -> int:
+    """필터가 적용된 쿼리의 전체 행 수"""
+    return await db.scalar(select(func.count()).select_from(stmt.subquery()))
+
 @router.get("/documents")
 async def get_document_history(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     limit: int = Query(50, ge=1, le=100),
     offset: int = Query(0, ge=0),
     filetype: Optional[str] = None,
     date_from: Optional[str] = None,
-    date_to: Optional[str] = None
+    date_to: Optional[str] = None,
+    after_uploaded_at: Optional[str] = None,
+    after_id: Optional[str] = None
 ):
-    """업로드된 문서 히스토리 조회"""
+    """업로드된 문서 히스토리 조회 (after_uploaded_at/after_id 커서를 주면 키셋 페이지네이션)"""
     try:
-        query = db.query(DocumentModel)
-        
+        # 본문 대신 길이만 DB에서 계산하여 조회
+        query = select(
+            DocumentModel.id,
+            DocumentModel.filename,
+            DocumentModel.filetype,
+            func.length(DocumentModel.content).label("content_length"),
+            DocumentModel.uploaded_at
+        )
+
         # 파일 타입 필터
         if filetype:
-            query = query.filter(DocumentModel.filetype == filetype)
-        
+            query = query.where(DocumentModel.filetype == filetype)
+
         # 날짜 범위 필터
         if date_from:
             try:
-                from_date = datetime.fromisoformat(date_from.replace('Z', '+00:00'))
-                query = query.filter(DocumentModel.uploaded_at >= from_date)
+                from_date = _parse_iso(date_from)
+                query = query.where(DocumentModel.uploaded_at >= from_date)
             except ValueError:
                 raise CustomAPIException("잘못된 날짜 형식입니다. ISO 형식을 사용해주세요.")
-        
+
         if date_to:
             try:
-                to_date = datetime.fromisoformat(date_to.replace('Z', '+00:00'))
-                query = query.filter(DocumentModel.uploaded_at <= to_date)
+                to_date = _parse_iso(date_to)
+                query = query.where(DocumentModel.uploaded_at <= to_date)
             except ValueError:
                 raise CustomAPIException("잘못된 날짜 형식입니다. ISO 형식을 사용해주세요.")
-        
-        # 정렬 및 페이징
-        documents = query.order_by(DocumentModel.uploaded_at.desc()).offset(offset).limit(limit).all()
-        
-        # 전체 개수 조회
-        total_count = query.count()
-        
+
+        order = (DocumentModel.uploaded_at.desc(), DocumentModel.id.desc())
+
+        if after_uploaded_at or after_id:
+            # 키셋 페이지네이션: 커서 이후 limit + 1개만 인덱스 범위 스캔
+            cursor_date, cursor_id = _parse_cursor(after_uploaded_at, after_id)
+            rows = (await db.execute(
+                query.where(
+                    tuple_(DocumentModel.uploaded_at, DocumentModel.id) < tuple_(cursor_date, cursor_id)
+                ).order_by(*order).limit(limit + 1)
+            )).all()
+            documents = rows[:limit]
+            has_more = len(rows) > limit
+            total_count = None  # 깊은 페이지에서는 전체 개수 생략
+        else:
+            # 정렬 및 페이징 (전체 개수는 윈도우 함수로 같은 스캔에서 계산)
+            documents = (await db.execute(
+                query.add_columns(func.count().over().label("total")).order_by(
+                    *order
+                ).offset(offset).limit(limit)
+            )).all()
+
+            # 전체 개수 (범위를 벗어난 페이지만 별도 조회)
+            if documents:
+                total_count = documents[0].total
+            elif offset > 0:
+                total_count = await _count(db, query)
+            else:
+                total_count = 0
+            has_more = offset + limit < total_count
+
+        next_cursor = None
+        if documents and has_more:
+            next_cursor = {
+                "uploaded_at": documents[-1].uploaded_at.isoformat(),
+                "id": str(documents[-1].id)
+            }
+
         return {
             "success": True,
             "message": "문서 히스토리 조회 완료",
@@ -56,7 +127,7 @@ async def get_document_history(
                         "id": str(doc.id),
                         "filename": doc.filename,
                         "filetype": doc.filetype,
-                        "content_length": len(doc.content),
+                        "content_length": doc.content_length,
                         "uploaded_at": doc.uploaded_at.isoformat()
                     }
                     for doc in documents
@@ -65,11 +136,12 @@ async def get_document_history(
                     "total": total_count,
                     "limit": limit,
                     "offset": offset,
-                    "has_more": offset + limit < total_count
+                    "has_more": has_more,
+                    "next_cursor": next_cursor
                 }
             }
         }
-        
+
     except CustomAPIException:
         raise
     except Exception as e:
@@ -77,55 +149,95 @@ async def get_document_history(
 
 @router.get("/qa")
 async def get_qa_history(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     limit: int = Query(50, ge=1, le=100),
     offset: int = Query(0, ge=0),
     feedback: Optional[bool] = None,
     date_from: Optional[str] = None,
-    date_to: Optional[str] = None
+    date_to: Optional[str] = None,
+    after_created_at: Optional[str] = None,
+    after_id: Optional[str] = None,
+    after_answer_id: Optional[str] = None
 ):
-    """질의응답 히스토리 조회"""
+    """질의응답 히스토리 조회 (after_created_at/after_id/after_answer_id 커서를 주면 키셋 페이지네이션)"""
     try:
-        query = db.query(QueryModel, AnswerModel).join(
+        # 임베딩 컬럼을 제외한 필요한 컬럼만 조회
+        query = select(
+            QueryModel.id.label("question_id"),
+            AnswerModel.id.label("answer_id"),
+            QueryModel.question,
+            AnswerModel.answer,
+            AnswerModel.is_positive,
+            QueryModel.created_at
+        ).join(
             AnswerModel, QueryModel.id == AnswerModel.question_id
         )
-        
+
         # 피드백 필터
         if feedback is not None:
-            query = query.filter(AnswerModel.is_positive == feedback)
-        
+            query = query.where(AnswerModel.is_positive == feedback)
+
         # 날짜 범위 필터
         if date_from:
             try:
-                from_date = datetime.fromisoformat(date_from.replace('Z', '+00:00'))
-                query = query.filter(QueryModel.created_at >= from_date)
+                from_date = _parse_iso(date_from)
+                query = query.where(QueryModel.created_at >= from_date)
             except ValueError:
                 raise CustomAPIException("잘못된 날짜 형식입니다. ISO 형식을 사용해주세요.")
-        
+
         if date_to:
             try:
-                to_date = datetime.fromisoformat(date_to.replace('Z', '+00:00'))
-                query = query.filter(QueryModel.created_at <= to_date)
+                to_date = _parse_iso(date_to)
+                query = query.where(QueryModel.created_at <= to_date)
             except ValueError:
                 raise CustomAPIException("잘못된 날짜 형식입니다. ISO 형식을 사용해주세요.")
-        
-        # 정렬 및 페이징
-        qa_history = query.order_by(QueryModel.created_at.desc()).offset(offset).limit(limit).all()
-        
-        # 전체 개수 조회
-        total_count = query.count()
-        
+
+        # 질문 하나에 응답이 여러 개일 수 있으므로 응답 id까지 정렬 키에 포함
+        order = (QueryModel.created_at.desc(), QueryModel.id.desc(), AnswerModel.id.desc())
+
+        if after_created_at or after_id or after_answer_id:
+            # 키셋 페이지네이션: 커서 이후 limit + 1개만 인덱스 범위 스캔
+            cursor_date, cursor_id = _parse_cursor(after_created_at, after_id)
+            if not after_answer_id:
+                raise CustomAPIException("커서에는 시각과 id가 모두 필요합니다.")
+            cursor_answer_id = _parse_id(after_answer_id, "잘못된 커서 형식입니다.")
+            rows = (await db.execute(
+                query.where(
+                    tuple_(QueryModel.created_at, QueryModel.id, AnswerModel.id)
+                    < tuple_(cursor_date, cursor_id, cursor_answer_id)
+                ).order_by(*order).limit(limit + 1)
+            )).all()
+            qa_history = rows[:limit]
+            has_more = len(rows) > limit
+            total_count = None  # 깊은 페이지에서는 전체 개수 생략
+        else:
+            # 정렬 및 페이징 (전체 개수는 윈도우 함수로 같은 스캔에서 계산)
+            qa_history = (await db.execute(
+                query.add_columns(func.count().over().label("total")).order_by(
+                    *order
+                ).offset(offset).limit(limit)
+            )).all()
+
+            # 전체 개수 (범위를 벗어난 페이지만 별도 조회)
+            if qa_history:
+                total_count = qa_history[0].total
+            elif offset > 0:
+                total_count = await _count(db, query)
+            else:
+                total_count = 0
+            has_more = offset + limit < total_count
+
         history = []
-        for query_obj, answer in qa_history:
+        for row in qa_history:
             history.append({
-                "question_id": str(query_obj.id),
-                "answer_id": str(answer.id),
-                "question": query_obj.question,
-                "answer": answer.answer,
-                "is_positive": answer.is_positive,
-                "created_at": query_obj.created_at.isoformat()
+                "question_id": str(row.question_id),
+                "answer_id": str(row.answer_id),
+                "question": row.question,
+                "answer": row.answer,
+                "is_positive": row.is_positive,
+                "created_at": row.created_at.isoformat()
             })
-        
+
         return {
             "success": True,
             "message": "질의응답 히스토리 조회 완료",
@@ -135,49 +247,80 @@ async def get_qa_history(
                     "total": total_count,
                     "limit": limit,
                     "offset": offset,
-                    "has_more": offset + limit < total_count
+                    "has_more": has_more,
+                    "next_cursor": {
+                        "created_at": history[-1]["created_at"],
+                        "id": history[-1]["question_id"],
+                        "answer_id": history[-1]["answer_id"]
+                    } if history and has_more else None
                 }
             }
         }
-        
+
     except CustomAPIException:
         raise
     except Exception as e:
         raise CustomAPIException(f"질의응답 히스토리 조회 중 오류가 발생했습니다: {str(e)}")
 
 @router.get("/statistics")
-async def get_history_statistics(db: Session = Depends(get_db)):
+async def get_history_statistics(db: AsyncSession = Depends(get_async_db)):
     """히스토리 통계 정보 조회"""
     try:
-        # 문서 통계
-        total_documents = db.query(DocumentModel).count()
-        pdf_count = db.query(DocumentModel).filter(DocumentModel.filetype == ".pdf").count()
-        docx_count = db.query(DocumentModel).filter(DocumentModel.filetype == ".docx").count()
-        
-        # 질의응답 통계
-        total_queries = db.query(QueryModel).count()
-        total_answers = db.query(AnswerModel).count()
-        positive_feedback = db.query(AnswerModel).filter(AnswerModel.is_positive == True).count()
-        negative_feedback = db.query(AnswerModel).filter(AnswerModel.is_positive == False).count()
-        
-        # 최근 7일 통계
-        week_ago = datetime.now() - timedelta(days=7)
-        recent_documents = db.query(DocumentModel).filter(
-            DocumentModel.uploaded_at >= week_ago
-        ).count()
-        recent_queries = db.query(QueryModel).filter(
-            QueryModel.created_at >= week_ago
-        ).count()
-        
+        week_ago = datetime.now(timezone.utc) - timedelta(days=7)
+
+        # 문서/파일 타입/질문/응답 집계를 한 문장으로 조회 (요청당 커넥션 하나, 왕복 한 번)
+        doc_stats = select(
+            func.count().label("total"),
+            func.sum(case((DocumentModel.filetype == ".pdf", 1), else_=0)).label("pdf"),
+            func.sum(case((DocumentModel.filetype == ".docx", 1), else_=0)).label("docx"),
+            func.sum(case((DocumentModel.uploaded_at >= week_ago, 1), else_=0)).label("recent")
+        ).select_from(DocumentModel).subquery()
+        filetype_counts = select(
+            DocumentModel.filetype, func.count().label("count")
+        ).group_by(DocumentModel.filetype).subquery()
+        query_stats = select(
+            func.count().label("total"),
+            func.sum(case((QueryModel.created_at >= week_ago, 1), else_=0)).label("recent")
+        ).select_from(QueryModel).subquery()
+        answer_stats = select(
+            func.count().label("total"),
+            func.sum(case((AnswerModel.is_positive == True, 1), else_=0)).label("positive"),
+            func.sum(case((AnswerModel.is_positive == False, 1), else_=0)).label("negative")
+        ).select_from(AnswerModel).subquery()
+
+        stats = (await db.execute(
+            select(
+                doc_stats.c.total.label("total_documents"),
+                doc_stats.c.pdf,
+                doc_stats.c.docx,
+                doc_stats.c.recent.label("recent_documents"),
+                select(
+                    func.json_object_agg(filetype_counts.c.filetype, filetype_counts.c["count"], type_=JSON)
+                ).scalar_subquery().label("by_filetype"),
+                query_stats.c.total.label("total_queries"),
+                query_stats.c.recent.label("recent_queries"),
+                answer_stats.c.total.label("total_answers"),
+                answer_stats.c.positive,
+                answer_stats.c.negative
+            ).select_from(
+                doc_stats.join(query_stats, true()).join(answer_stats, true())
+            )
+        )).one()
+
         # 파일 타입별 통계
-        filetype_stats = {}
-        filetypes = db.query(DocumentModel.filetype).distinct().all()
-        for filetype in filetypes:
-            count = db.query(DocumentModel).filter(
-                DocumentModel.filetype == filetype[0]
-            ).count()
-            filetype_stats[filetype[0]] = count
-        
+        filetype_stats = stats.by_filetype or {}
+
+        # 빈 테이블에서 SUM/json_object_agg는 NULL을 반환
+        total_documents = stats.total_documents
+        pdf_count = stats.pdf or 0
+        docx_count = stats.docx or 0
+        recent_documents = stats.recent_documents or 0
+        total_queries = stats.total_queries
+        recent_queries = stats.recent_queries or 0
+        total_answers = stats.total_answers
+        positive_feedback = stats.positive or 0
+        negative_feedback = stats.negative or 0
+
         return {
             "success": True,
             "message": "통계 정보 조회 완료",
@@ -199,53 +342,112 @@ async def get_history_statistics(db: Session = Depends(get_db)):
                 }
             }
         }
-        
+
     except Exception as e:
         raise CustomAPIException(f"통계 정보 조회 중 오류가 발생했습니다: {str(e)}")
 
+@router.get("/bulk")
+async def get_history_bulk(
+    db: AsyncSession = Depends(get_async_db),
+    docs_limit: int = Query(20, ge=1, le=100),
+    docs_offset: int = Query(0, ge=0),
+    qa_limit: int = Query(20, ge=1, le=100),
+    qa_offset: int = Query(0, ge=0),
+    filetype: Optional[str] = None,
+    feedback: Optional[bool] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    qa_date_from: Optional[str] = None,
+    qa_date_to: Optional[str] = None,
+    docs_after_uploaded_at: Optional[str] = None,
+    docs_after_id: Optional[str] = None,
+    qa_after_created_at: Optional[str] = None,
+    qa_after_id: Optional[str] = None,
+    qa_after_answer_id: Optional[str] = None
+):
+    """통계 + 문서/질의응답 히스토리 페이지를 한 번에 조회 (대시보드 요청 수 절감, 커서를 주면 키셋 페이지네이션)"""
+    try:
+        # 세 조회 모두 요청 세션 하나에서 순서대로 실행 (커넥션 하나만 사용)
+        statistics = await get_history_statistics(db=db)
+        documents = await get_document_history(
+            db=db, limit=docs_limit, offset=docs_offset, filetype=filetype,
+            date_from=date_from, date_to=date_to,
+            after_uploaded_at=docs_after_uploaded_at, after_id=docs_after_id
+        )
+        qa = await get_qa_history(
+            db=db, limit=qa_limit, offset=qa_offset, feedback=feedback,
+            date_from=qa_date_from, date_to=qa_date_to,
+            after_created_at=qa_after_created_at, after_id=qa_after_id,
+            after_answer_id=qa_after_answer_id
+        )
+
+        return {
+            "success": True,
+            "message": "히스토리 일괄 조회 완료",
+            "data": {
+                "statistics": statistics["data"],
+                "documents": documents["data"],
+                "qa": qa["data"]
+            }
+        }
+
+    except CustomAPIException:
+        raise
+    except Exception as e:
+        raise CustomAPIException(f"히스토리 일괄 조회 중 오류가 발생했습니다: {str(e)}")
+
 @router.delete("/documents/{document_id}")
-async def delete_document_from_history(document_id: str, db: Session = Depends(get_db)):
+async def delete_document_from_history(document_id: str, db: AsyncSession = Depends(get_async_db)):
     """히스토리에서 문서 삭제"""
     try:
-        document = db.query(DocumentModel).filter(DocumentModel.id == document_id).first()
-        if not document:
+        result = await db.execute(
+            delete(DocumentModel).where(
+                DocumentModel.id == _parse_id(document_id, "문서를 찾을 수 없습니다.")
+            )
+        )
+        if result.rowcount == 0:
             raise CustomAPIException("문서를 찾을 수 없습니다.")
-        
-        db.delete(document)
-        db.commit()
-        
+
+        # 삭제된 문서를 근거로 한 캐시 답변이 재사용되지 않도록 시맨틱 캐시 비우기
+        await db.execute(delete(QACacheModel))
+        await db.commit()
+        semantic_cache.clear()
+
         return {
             "success": True,
             "message": "문서 삭제 완료",
             "data": None
         }
-        
+
     except CustomAPIException:
         raise
     except Exception as e:
         raise CustomAPIException(f"문서 삭제 중 오류가 발생했습니다: {str(e)}")
 
 @router.delete("/qa/{question_id}")
-async def delete_qa_from_history(question_id: str, db: Session = Depends(get_db)):
+async def delete_qa_from_history(question_id: str, db: AsyncSession = Depends(get_async_db)):
     """히스토리에서 질의응답 삭제"""
     try:
-        # 질문과 관련된 응답들 삭제
-        answers = db.query(AnswerModel).filter(AnswerModel.question_id == question_id).all()
-        for answer in answers:
-            db.delete(answer)
-        
-        # 질문 삭제
-        query = db.query(QueryModel).filter(QueryModel.id == question_id).first()
-        if query:
-            db.delete(query)
-        
-        db.commit()
-        
+        question_uuid = _parse_id(question_id, "질의응답을 찾을 수 없습니다.")
+
+        # 질문과 관련된 응답들, 질문을 한 트랜잭션에서 일괄 삭제
+        await db.execute(
+            delete(AnswerModel).where(AnswerModel.question_id == question_uuid)
+        )
+        await db.execute(
+            delete(QueryModel).where(QueryModel.id == question_uuid)
+        )
+
+        await db.commit()
+        semantic_cache.invalidate_question(str(question_uuid))
+
         return {
             "success": True,
             "message": "질의응답 삭제 완료",
             "data": None
         }
-        
+
+    except CustomAPIException:
+        raise
     except Exception as e:
-        raise CustomAPIException(f"질의응답 삭제 중 오류가 발생했습니다: {str(e)}") 
\ No newline at end of file
+        raise CustomAPIException(f"질의응답 삭제 중 오류가 발생했습니다: {str(e)}")
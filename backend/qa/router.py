@@ -1,20 +1,31 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Header
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from pydantic import BaseModel
-from typing import Optional, List
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from pydantic import BaseModel, Field
+from typing import Optional, List, Dict, Any, Tuple, Union, AsyncIterator
+from datetime import datetime, timezone
+import asyncio
+import secrets
+import json
 import uuid
-import openai
-from openai import AzureOpenAI
+import logging
+import httpx
+from openai import AsyncAzureOpenAI, AsyncOpenAI
 
-from db.database import get_db
+from db.database import get_db, get_async_db, SessionLocal
 from db.models import Query as QueryModel, Answer as AnswerModel, Document as DocumentModel
+from backend.retrieval import get_vector_search
+from backend.retrieval.chunking import pack_context
 from backend.retrieval.vector_search import VectorSearch
+from backend.qa.semantic_cache import semantic_cache
 from backend.config import settings
 from backend.core.exception_handler import CustomAPIException
 
-router = APIRouter(prefix="/qa", tags=["qa"])
+logger = logging.getLogger(__name__)
 
-vector_search = VectorSearch()
+router = APIRouter(prefix="/qa", tags=["qa"])
 
 class QuestionRequest(BaseModel):
     question: str
@@ -23,24 +34,19 @@ class QuestionRequest(BaseModel):
 class FeedbackRequest(BaseModel):
     is_positive: bool
 
-def generate_llm_response(question: str, context_docs: List[dict]) -> str:
-    """LLM을 사용하여 응답 생성"""
-    try:
-        # Azure OpenAI 사용
-        if settings.AZURE_OPENAI_API_KEY and settings.AZURE_OPENAI_ENDPOINT:
-            client = AzureOpenAI(
-                api_key=settings.AZURE_OPENAI_API_KEY,
-                api_version=settings.AZURE_OPENAI_API_VERSION,
-                azure_endpoint=settings.AZURE_OPENAI_ENDPOINT
-            )
-            
-            # 컨텍스트 문서들을 요약하여 프롬프트 구성
-            context_text = "\n\n".join([
-                f"문서 {i+1}: {doc['content'][:500]}..." 
-                for i, doc in enumerate(context_docs[:3])  # Top 3 문서만 사용
-            ])
-            
-            prompt = f"""다음 문서들을 참고하여 질문에 답변해주세요.
+class CacheConfigRequest(BaseModel):
+    tau: float = Field(..., ge=0.0, le=1.0)
+
+SYSTEM_PROMPT = "당신은 문서를 기반으로 정확하고 유용한 답변을 제공하는 AI 어시스턴트입니다."
+
+def build_prompt(question: str, context_docs: List[dict]) -> str:
+    """컨텍스트 문서들을 토큰 예산에 맞춰 프롬프트 구성"""
+    context_text = "\n\n".join([
+        f"문서 {i+1}: {content}"
+        for i, content in enumerate(pack_context(context_docs))  # 유사도 순으로 예산까지 사용
+    ])
+    
+    return f"""다음 문서들을 참고하여 질문에 답변해주세요.
 
 문서 내용:
 {context_text}
@@ -48,125 +54,222 @@ def generate_llm_response(question: str, context_docs: List[dict]) -> str:
 질문: {question}
 
 답변:"""
-            
-            response = client.chat.completions.create(
-                model="gpt-35-turbo",  # Azure OpenAI 모델명
-                messages=[
-                    {"role": "system", "content": "당신은 문서를 기반으로 정확하고 유용한 답변을 제공하는 AI 어시스턴트입니다."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=500,
-                temperature=0.7
-            )
-            
-            return response.choices[0].message.content
-            
-        # OpenAI fallback
-        elif settings.OPENAI_API_KEY:
-            openai.api_key = settings.OPENAI_API_KEY
-            
-            context_text = "\n\n".join([
-                f"문서 {i+1}: {doc['content'][:500]}..." 
-                for i, doc in enumerate(context_docs[:3])
-            ])
-            
-            prompt = f"""다음 문서들을 참고하여 질문에 답변해주세요.
 
-문서 내용:
-{context_text}
+def build_fallback_response(context_docs: List[dict]) -> str:
+    """LLM이 없는 경우 벡터 검색 결과만 반환"""
+    if context_docs:
+        return f"관련 문서를 찾았습니다:\n\n" + "\n\n".join([
+            f"문서: {doc['filename']}\n유사도: {doc['similarity']:.3f}\n내용: {doc['content'][:200]}..."
+            for doc in context_docs
+        ])
+    else:
+        return "관련 문서를 찾을 수 없습니다."
 
-질문: {question}
+def create_llm_client() -> Optional[Tuple[Union[AsyncAzureOpenAI, AsyncOpenAI], str]]:
+    """비동기 LLM 클라이언트와 모델명 생성 (연결 풀을 공유하도록 한 번만 호출)"""
+    # 요청이 몰려도 keep-alive 연결을 재사용하도록 풀 크기 지정
+    http_client = httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=50)
+    )
+    
+    # Azure OpenAI 사용
+    if settings.AZURE_OPENAI_API_KEY and settings.AZURE_OPENAI_ENDPOINT:
+        client = AsyncAzureOpenAI(
+            api_key=settings.AZURE_OPENAI_API_KEY,
+            api_version=settings.AZURE_OPENAI_API_VERSION,
+            azure_endpoint=settings.AZURE_OPENAI_ENDPOINT,
+            http_client=http_client
+        )
+        return client, "gpt-35-turbo"  # Azure OpenAI 모델명
+    
+    # OpenAI fallback
+    elif settings.OPENAI_API_KEY:
+        return AsyncOpenAI(api_key=settings.OPENAI_API_KEY, http_client=http_client), "gpt-3.5-turbo"
+    
+    return None
 
-답변:"""
-            
-            response = openai.ChatCompletion.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "당신은 문서를 기반으로 정확하고 유용한 답변을 제공하는 AI 어시스턴트입니다."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=500,
-                temperature=0.7
-            )
-            
-            return response.choices[0].message.content
-            
-        else:
-            # LLM이 없는 경우 벡터 검색 결과만 반환
-            if context_docs:
-                return f"관련 문서를 찾았습니다:\n\n" + "\n\n".join([
-                    f"문서: {doc['filename']}\n유사도: {doc['similarity']:.3f}\n내용: {doc['content'][:200]}..."
-                    for doc in context_docs
-                ])
-            else:
-                return "관련 문서를 찾을 수 없습니다."
+# 요청마다 TLS 핸드셰이크를 반복하지 않도록 모듈 로드 시 한 번 생성
+llm_client = create_llm_client()
+
+async def stream_llm_response(question: str, context_docs: List[dict]) -> AsyncIterator[str]:
+    """LLM 응답을 토큰 단위로 스트리밍"""
+    try:
+        if llm_client is None:
+            yield build_fallback_response(context_docs)
+            return
+        
+        client, model = llm_client
+        stream = await client.chat.completions.create(
+            model=model,
+            messages=[
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": build_prompt(question, context_docs)}
+            ],
+            max_tokens=500,
+            temperature=0.7,
+            stream=True
+        )
+        
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
                 
     except Exception as e:
         raise CustomAPIException(f"LLM 응답 생성 중 오류가 발생했습니다: {str(e)}")
 
+async def generate_llm_response(question: str, context_docs: List[dict]) -> str:
+    """LLM을 사용하여 응답 생성"""
+    return "".join([token async for token in stream_llm_response(question, context_docs)])
+
+async def embed_question(vector_search: VectorSearch, request: QuestionRequest) -> List[float]:
+    """질문 임베딩 생성 (이벤트 루프를 막지 않도록 스레드에서 실행)"""
+    return await asyncio.to_thread(
+        vector_search.embedding_generator.get_embedding,
+        request.question,
+        request.model_name
+    )
+
+async def search_documents(vector_search: VectorSearch, db: Session, request: QuestionRequest, 
+                           question_embedding: List[float]) -> List[dict]:
+    """벡터 검색으로 관련 문서 찾기 (스레드에서 실행)"""
+    return await asyncio.to_thread(
+        vector_search.search_pgvector,
+        db=db,
+        query=request.question,
+        model_name=request.model_name,
+        top_k=settings.TOP_K_RESULTS,
+        query_embedding=question_embedding
+    )
+
+async def lookup_cache(db: Session, request: QuestionRequest,
+                       question_embedding: List[float]) -> Optional[Dict[str, Any]]:
+    """시맨틱 캐시 조회 (첫 조회의 캐시 로드와 유사도 계산이 이벤트 루프를 막지 않도록 스레드에서 실행)"""
+    return await asyncio.to_thread(semantic_cache.lookup, db, question_embedding, request.model_name)
+
+def build_answer_data(question_id: uuid.UUID, answer_id: uuid.UUID, question: str, answer_text: str,
+                      relevant_docs: List[dict], created_at: datetime) -> Dict[str, Any]:
+    """응답 데이터 구성"""
+    return {
+        "question_id": str(question_id),
+        "answer_id": str(answer_id),
+        "question": question,
+        "answer": answer_text,
+        "relevant_documents": [
+            {
+                "filename": doc["filename"],
+                "similarity": doc["similarity"],
+                "content_preview": doc["content"][:200] + "..."
+            }
+            for doc in relevant_docs
+        ],
+        "created_at": created_at.isoformat()
+    }
+
+def build_cached_data(cached: Dict[str, Any], question: str) -> Dict[str, Any]:
+    """시맨틱 캐시 적중 시 응답 데이터 구성 (캐시된 답변으로 새 질문/응답 id 발급)"""
+    return dict(
+        cached,
+        question_id=str(uuid.uuid4()),
+        answer_id=str(uuid.uuid4()),
+        question=question,
+        created_at=datetime.now(timezone.utc).isoformat(),
+        matched_question=cached["question"],
+        cached=True
+    )
+
+def save_qa(data: Dict[str, Any], question_embedding: List[float]):
+    """질문/응답 저장 (응답 전송 전에 한 트랜잭션으로 커밋해 히스토리/피드백에서 바로 조회 가능)"""
+    db = SessionLocal()
+    try:
+        # 질문 저장 (id는 미리 생성되어 있으므로 refresh 불필요)
+        query = QueryModel(
+            id=uuid.UUID(data["question_id"]),
+            question=data["question"],
+            embedding=question_embedding
+        )
+        db.add(query)
+        db.flush()  # 응답의 외래 키보다 먼저 질문 삽입
+        
+        # 응답 저장
+        answer = AnswerModel(
+            id=uuid.UUID(data["answer_id"]),
+            question_id=query.id,
+            answer=data["answer"]
+        )
+        db.add(answer)
+        db.commit()
+        
+    except Exception as e:
+        db.rollback()
+        raise CustomAPIException(f"질의응답 저장 중 오류가 발생했습니다: {str(e)}")
+    finally:
+        db.close()
+
+def cache_qa(data: Dict[str, Any], question_embedding: List[float], model_name: str):
+    """시맨틱 캐시에 등록 (응답 전송 후 백그라운드에서 실행)"""
+    if not settings.SEMANTIC_CACHE_ENABLED:
+        return
+    
+    db = SessionLocal()
+    try:
+        semantic_cache.add(db, question_embedding, model_name, data)
+        db.commit()
+        
+    except Exception as e:
+        db.rollback()
+        # 저장되지 않은 캐시 항목 제거
+        semantic_cache.invalidate_question(data["question_id"])
+        logger.error(f"Error caching question {data['question_id']}: {e}")
+    finally:
+        db.close()
+
+def format_sse(event: str, data: Dict[str, Any]) -> str:
+    """Server-Sent Events 메시지 포맷"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
 @router.post("/ask")
 async def ask_question(
     request: QuestionRequest,
-    db: Session = Depends(get_db)
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    vector_search: VectorSearch = Depends(get_vector_search)
 ):
     """질문에 대한 답변 생성"""
     try:
-        # 1. 벡터 검색으로 관련 문서 찾기
-        relevant_docs = vector_search.search_pgvector(
-            db=db,
-            query=request.question,
-            model_name=request.model_name,
-            top_k=settings.TOP_K_RESULTS
-        )
+        # 1. 질문 임베딩 생성
+        question_embedding = await embed_question(vector_search, request)
         
-        # 2. 질문 임베딩 생성
-        question_embedding = vector_search.embedding_generator.get_embedding(
-            request.question, 
-            request.model_name
-        )
+        # 2. 시맨틱 캐시 조회 (유사한 이전 질문이 있으면 검색과 LLM 호출 생략)
+        if settings.SEMANTIC_CACHE_ENABLED:
+            cached = await lookup_cache(db, request, question_embedding)
+            if cached:
+                # 캐시된 답변도 새 질문/응답으로 저장해 히스토리에 남기고 피드백이 원래 응답을 바꾸지 않도록 함
+                data = build_cached_data(cached, request.question)
+                await asyncio.to_thread(save_qa, data, question_embedding)
+                return {
+                    "success": True,
+                    "message": "질문 처리 완료 (캐시)",
+                    "data": data
+                }
         
-        # 3. 질문 저장
-        query = QueryModel(
-            id=uuid.uuid4(),
-            question=request.question,
-            embedding=question_embedding
-        )
-        db.add(query)
-        db.commit()
-        db.refresh(query)
+        # 3. 벡터 검색으로 관련 문서 찾기
+        relevant_docs = await search_documents(vector_search, db, request, question_embedding)
         
         # 4. LLM 응답 생성
-        answer_text = generate_llm_response(request.question, relevant_docs)
+        answer_text = await generate_llm_response(request.question, relevant_docs)
         
-        # 5. 응답 저장
-        answer = AnswerModel(
-            id=uuid.uuid4(),
-            question_id=query.id,
-            answer=answer_text,
-            embedding=question_embedding  # 질문 임베딩을 응답에도 저장
+        # 5. 질문/응답 저장 후 반환, 시맨틱 캐시 등록만 응답 후 백그라운드에서 실행 (id는 클라이언트 측에서 생성)
+        data = build_answer_data(
+            uuid.uuid4(), uuid.uuid4(), request.question, answer_text,
+            relevant_docs, datetime.now(timezone.utc)
         )
-        db.add(answer)
-        db.commit()
-        db.refresh(answer)
+        await asyncio.to_thread(save_qa, data, question_embedding)
+        background_tasks.add_task(cache_qa, data, question_embedding, request.model_name)
         
         return {
             "success": True,
             "message": "질문 처리 완료",
-            "data": {
-                "question_id": str(query.id),
-                "answer_id": str(answer.id),
-                "question": request.question,
-                "answer": answer_text,
-                "relevant_documents": [
-                    {
-                        "filename": doc["filename"],
-                        "similarity": doc["similarity"],
-                        "content_preview": doc["content"][:200] + "..."
-                    }
-                    for doc in relevant_docs
-                ],
-                "created_at": answer.created_at.isoformat()
-            }
+            "data": data
         }
         
     except CustomAPIException:
@@ -174,6 +277,75 @@ async def ask_question(
     except Exception as e:
         raise CustomAPIException(f"질문 처리 중 오류가 발생했습니다: {str(e)}")
 
+@router.post("/ask/stream")
+async def ask_question_stream(
+    request: QuestionRequest,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    vector_search: VectorSearch = Depends(get_vector_search)
+):
+    """질문에 대한 답변을 Server-Sent Events로 스트리밍
+    
+    이벤트 순서: meta(id, 관련 문서) → token(답변 조각)* → done(전체 응답) 또는 error
+    """
+    try:
+        question_embedding = await embed_question(vector_search, request)
+        
+        cached = None
+        if settings.SEMANTIC_CACHE_ENABLED:
+            cached = await lookup_cache(db, request, question_embedding)
+        
+        relevant_docs = [] if cached else await search_documents(vector_search, db, request, question_embedding)
+        
+    except CustomAPIException:
+        raise
+    except Exception as e:
+        raise CustomAPIException(f"질문 처리 중 오류가 발생했습니다: {str(e)}")
+    
+    async def event_stream():
+        if cached:
+            # 캐시된 답변도 새 질문/응답으로 저장해 히스토리에 남기고 피드백이 원래 응답을 바꾸지 않도록 함
+            data = build_cached_data(cached, request.question)
+            try:
+                await asyncio.to_thread(save_qa, data, question_embedding)
+            except CustomAPIException as e:
+                yield format_sse("error", {"message": e.message})
+                return
+            yield format_sse("meta", {key: value for key, value in data.items() if key != "answer"})
+            yield format_sse("token", {"content": data["answer"]})
+            yield format_sse("done", data)
+            return
+        
+        data = build_answer_data(
+            uuid.uuid4(), uuid.uuid4(), request.question, "",
+            relevant_docs, datetime.now(timezone.utc)
+        )
+        yield format_sse("meta", {key: value for key, value in data.items() if key != "answer"})
+        
+        parts = []
+        try:
+            async for token in stream_llm_response(request.question, relevant_docs):
+                parts.append(token)
+                yield format_sse("token", {"content": token})
+        except CustomAPIException as e:
+            yield format_sse("error", {"message": e.message})
+            return
+        
+        data["answer"] = "".join(parts)
+        
+        # done 이벤트 전에 저장을 마쳐 클라이언트가 곧바로 히스토리 조회/피드백 가능
+        try:
+            await asyncio.to_thread(save_qa, data, question_embedding)
+        except CustomAPIException as e:
+            yield format_sse("error", {"message": e.message})
+            return
+        yield format_sse("done", data)
+        
+        # 스트림 종료 후 시맨틱 캐시 등록
+        background_tasks.add_task(cache_qa, data, question_embedding, request.model_name)
+    
+    return StreamingResponse(event_stream(), media_type="text/event-stream", background=background_tasks)
+
 @router.patch("/answers/{answer_id}")
 async def update_feedback(
     answer_id: str,
@@ -204,23 +376,32 @@ async def update_feedback(
         raise CustomAPIException(f"피드백 업데이트 중 오류가 발생했습니다: {str(e)}")
 
 @router.get("/history")
-async def get_qa_history(db: Session = Depends(get_db)):
+async def get_qa_history(db: AsyncSession = Depends(get_async_db)):
     """질의응답 히스토리 조회"""
     try:
-        # 최근 질의응답 조회
-        qa_history = db.query(QueryModel, AnswerModel).join(
-            AnswerModel, QueryModel.id == AnswerModel.question_id
-        ).order_by(QueryModel.created_at.desc()).limit(50).all()
+        # 최근 질의응답 조회 (임베딩 컬럼 제외)
+        qa_history = (await db.execute(
+            select(
+                QueryModel.id.label("question_id"),
+                AnswerModel.id.label("answer_id"),
+                QueryModel.question,
+                AnswerModel.answer,
+                AnswerModel.is_positive,
+                QueryModel.created_at
+            ).join(
+                AnswerModel, QueryModel.id == AnswerModel.question_id
+            ).order_by(QueryModel.created_at.desc()).limit(50)
+        )).all()
         
         history = []
-        for query, answer in qa_history:
+        for row in qa_history:
             history.append({
-                "question_id": str(query.id),
-                "answer_id": str(answer.id),
-                "question": query.question,
-                "answer": answer.answer,
-                "is_positive": answer.is_positive,
-                "created_at": query.created_at.isoformat()
+                "question_id": str(row.question_id),
+                "answer_id": str(row.answer_id),
+                "question": row.question,
+                "answer": row.answer,
+                "is_positive": row.is_positive,
+                "created_at": row.created_at.isoformat()
             })
         
         return {
@@ -230,4 +411,31 @@ async def get_qa_history(db: Session = Depends(get_db)):
         }
         
     except Exception as e:
-        raise CustomAPIException(f"히스토리 조회 중 오류가 발생했습니다: {str(e)}") 
\ No newline at end of file
+        raise CustomAPIException(f"히스토리 조회 중 오류가 발생했습니다: {str(e)}") 
+
+@router.get("/cache")
+async def get_cache_stats():
+    """시맨틱 캐시 통계 조회"""
+    return {
+        "success": True,
+        "message": "캐시 통계 조회 완료",
+        "data": semantic_cache.stats()
+    }
+
+def require_admin(x_admin_key: Optional[str] = Header(None)):
+    """관리용 엔드포인트 접근 확인 (ADMIN_API_KEY 미설정 시 비활성화)"""
+    if not settings.ADMIN_API_KEY:
+        raise CustomAPIException("관리 기능이 비활성화되어 있습니다.", status_code=403)
+    if not x_admin_key or not secrets.compare_digest(x_admin_key, settings.ADMIN_API_KEY):
+        raise CustomAPIException("관리자 키가 올바르지 않습니다.", status_code=401)
+
+@router.patch("/cache", dependencies=[Depends(require_admin)])
+async def update_cache_threshold(config: CacheConfigRequest):
+    """시맨틱 캐시 유사도 임계값 변경 (이 프로세스에서 재시작 없이 즉시 반영, 재시작 시 SEMANTIC_CACHE_TAU 설정값으로 복원)"""
+    settings.SEMANTIC_CACHE_TAU = config.tau
+    
+    return {
+        "success": True,
+        "message": "캐시 임계값 변경 완료",
+        "data": semantic_cache.stats()
+    }
\ No newline at end of file
@@ -0,0 +1,178 @@
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import List, Dict, Any, Optional
+import numpy as np
+from sqlalchemy.orm import Session
+
+from db.models import QACache as QACacheModel, Query as QueryModel, Answer as AnswerModel
+from backend.config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+class _CacheBucket:
+    """모델별 정규화된 질문 임베딩 행렬과 응답 목록 (추가된 순서 = 오래된 순서)"""
+
+    def __init__(self, dimension: int):
+        self.matrix = np.empty((16, dimension), dtype=np.float32)
+        self.cached_at = np.empty(16, dtype=np.float64)  # 항목별 캐시 등록 시각 (epoch 초)
+        self.size = 0
+        self.entries: List[Dict[str, Any]] = []
+
+    def append(self, vector: np.ndarray, entry: Dict[str, Any], cached_at: float):
+        # 용량을 두 배씩 늘려 추가 비용을 분할 상환
+        if self.size == self.matrix.shape[0]:
+            self.matrix = np.vstack([self.matrix, np.empty_like(self.matrix)])
+            self.cached_at = np.concatenate([self.cached_at, np.empty_like(self.cached_at)])
+        self.matrix[self.size] = vector
+        self.cached_at[self.size] = cached_at
+        self.entries.append(entry)
+        self.size += 1
+
+    def remove(self, keep: np.ndarray):
+        kept = self.matrix[:self.size][keep]
+        self.matrix[:len(kept)] = kept
+        self.cached_at[:len(kept)] = self.cached_at[:self.size][keep]
+        self.entries = [entry for entry, k in zip(self.entries, keep) if k]
+        self.size = len(kept)
+
+    def evict(self, cutoff: float, max_entries: int):
+        """cutoff 이전에 등록된 항목과 최대 개수를 넘는 가장 오래된 항목 제거"""
+        keep = self.cached_at[:self.size] >= cutoff
+        keep[:max(self.size - max_entries, 0)] = False
+        if not keep.all():
+            self.remove(keep)
+
+class SemanticCache:
+    """질문 임베딩의 코사인 유사도로 기존 답변을 재사용하는 캐시"""
+
+    def __init__(self):
+        self._buckets: Dict[str, _CacheBucket] = {}
+        self._lock = threading.Lock()
+        self._loaded = False
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def threshold(self) -> float:
+        # 매 조회마다 설정을 읽어 재시작 없이 임계값 변경을 반영
+        return settings.SEMANTIC_CACHE_TAU
+
+    @staticmethod
+    def _normalize(embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    @staticmethod
+    def _cutoff() -> float:
+        """이 시각 이전에 등록된 항목은 만료"""
+        return time.time() - settings.SEMANTIC_CACHE_TTL_SECONDS
+
+    def _ensure_loaded(self, db: Session):
+        """DB에 저장된 만료되지 않은 캐시 항목으로 메모리 캐시 복원"""
+        if self._loaded:
+            return
+
+        cutoff = datetime.fromtimestamp(self._cutoff(), tz=timezone.utc)
+        rows = db.query(
+            QACacheModel.model_name,
+            QACacheModel.embedding,
+            QACacheModel.created_at,
+            QueryModel.id,
+            QueryModel.question,
+            AnswerModel.id,
+            AnswerModel.answer,
+            AnswerModel.created_at
+        ).join(
+            AnswerModel, AnswerModel.id == QACacheModel.answer_id
+        ).join(
+            QueryModel, QueryModel.id == AnswerModel.question_id
+        ).filter(
+            QACacheModel.created_at >= cutoff
+        ).order_by(QACacheModel.created_at).all()
+
+        for model_name, embedding, cached_at, question_id, question, answer_id, answer, created_at in rows:
+            self._append(model_name, np.frombuffer(embedding, dtype=np.float32), cached_at.timestamp(), {
+                "question_id": str(question_id),
+                "answer_id": str(answer_id),
+                "question": question,
+                "answer": answer,
+                "relevant_documents": [],
+                "created_at": created_at.isoformat()
+            })
+
+        self._loaded = True
+
+    def _append(self, model_name: str, vector: np.ndarray, cached_at: float, entry: Dict[str, Any]):
+        bucket = self._buckets.get(model_name)
+        if bucket is None:
+            bucket = self._buckets[model_name] = _CacheBucket(vector.shape[0])
+        bucket.append(vector, entry, cached_at)
+        bucket.evict(self._cutoff(), settings.SEMANTIC_CACHE_MAX_ENTRIES)
+
+    def lookup(self, db: Session, question_embedding: List[float], model_name: str) -> Optional[Dict[str, Any]]:
+        """임계값 이상으로 유사한 이전 질문의 답변 반환"""
+        query_vector = self._normalize(question_embedding)
+
+        with self._lock:
+            self._ensure_loaded(db)
+
+            bucket = self._buckets.get(model_name)
+            if bucket is not None:
+                bucket.evict(self._cutoff(), settings.SEMANTIC_CACHE_MAX_ENTRIES)
+            if bucket is None or bucket.size == 0:
+                self.misses += 1
+                return None
+
+            similarities = bucket.matrix[:bucket.size] @ query_vector
+            best = int(np.argmax(similarities))
+            similarity = float(similarities[best])
+
+            if similarity < self.threshold:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            return dict(bucket.entries[best], similarity=similarity)
+
+    def add(self, db: Session, question_embedding: List[float], model_name: str, entry: Dict[str, Any]):
+        """새 답변을 캐시에 추가하고 DB 세션에 영속화 항목 등록"""
+        vector = self._normalize(question_embedding)
+
+        with self._lock:
+            self._append(model_name, vector, time.time(), entry)
+
+        db.add(QACacheModel(
+            model_name=model_name,
+            embedding=vector.tobytes(),
+            answer_id=entry["answer_id"]
+        ))
+
+    def invalidate_question(self, question_id: str):
+        """삭제된 질문의 캐시 항목 제거"""
+        with self._lock:
+            for bucket in self._buckets.values():
+                keep = np.array([entry["question_id"] != question_id for entry in bucket.entries], dtype=bool)
+                if not keep.all():
+                    bucket.remove(keep)
+
+    def clear(self):
+        """문서 변경으로 기존 답변의 근거가 달라졌을 때 메모리 캐시 전체 비우기 (qa_cache 행은 호출자가 같은 트랜잭션에서 삭제)"""
+        with self._lock:
+            self._buckets.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """캐시 적중/미스 통계 반환"""
+        total = self.hits + self.misses
+        return {
+            "enabled": settings.SEMANTIC_CACHE_ENABLED,
+            "threshold": self.threshold,
+            "size": sum(bucket.size for bucket in self._buckets.values()),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total > 0 else 0
+        }
+
+semantic_cache = SemanticCache()
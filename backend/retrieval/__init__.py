@@ -0,0 +1,12 @@
+from functools import lru_cache
+
+from backend.retrieval.vector_search import EmbeddingGenerator, VectorSearch
+
+@lru_cache(maxsize=1)
+def get_vector_search() -> VectorSearch:
+    """프로세스 전체에서 공유하는 VectorSearch (최초 사용 시 생성)"""
+    return VectorSearch()
+
+def get_embedding_generator() -> EmbeddingGenerator:
+    """공유 VectorSearch의 임베딩 생성기 (모델 인스턴스를 프로세스당 한 번만 로드)"""
+    return get_vector_search().embedding_generator
@@ -0,0 +1,74 @@
+import asyncio
+from typing import Dict, List, Tuple
+import numpy as np
+from backend.config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+class EmbeddingBatcher:
+    """동시에 들어온 임베딩 요청을 모델별로 모아 한 번의 배치 호출로 처리"""
+
+    def __init__(self, embedding_generator, batch_size: int = None, timeout_ms: int = None):
+        self.embedding_generator = embedding_generator
+        self.batch_size = batch_size or settings.EMBEDDING_BATCH_SIZE
+        self.timeout = (timeout_ms or settings.EMBEDDING_BATCH_TIMEOUT_MS) / 1000
+        self._queues: Dict[str, asyncio.Queue] = {}
+        self._workers: Dict[str, asyncio.Task] = {}
+
+    async def encode(self, texts: List[str], model_name: str) -> np.ndarray:
+        """텍스트 목록의 임베딩 행렬 반환 (다른 요청과 합쳐서 인코딩될 수 있음)"""
+        future = asyncio.get_running_loop().create_future()
+        self._get_queue(model_name).put_nowait((texts, future))
+        return await future
+
+    def _get_queue(self, model_name: str) -> asyncio.Queue:
+        queue = self._queues.get(model_name)
+        if queue is None:
+            queue = self._queues[model_name] = asyncio.Queue()
+            self._workers[model_name] = asyncio.create_task(self._run(model_name, queue))
+        return queue
+
+    async def _collect(self, queue: asyncio.Queue) -> List[Tuple[List[str], asyncio.Future]]:
+        """첫 요청 이후 batch_size가 차거나 timeout이 지날 때까지 요청 수집"""
+        loop = asyncio.get_running_loop()
+        batch = [await queue.get()]
+        size = len(batch[0][0])
+        deadline = loop.time() + self.timeout
+
+        while size < self.batch_size:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(queue.get(), remaining)
+            except asyncio.TimeoutError:
+                break
+            batch.append(item)
+            size += len(item[0])
+
+        return batch
+
+    async def _run(self, model_name: str, queue: asyncio.Queue):
+        loop = asyncio.get_running_loop()
+
+        while True:
+            batch = await self._collect(queue)
+            texts = [text for item_texts, _ in batch for text in item_texts]
+
+            try:
+                embeddings = await loop.run_in_executor(
+                    None, self.embedding_generator.get_embeddings, texts, model_name
+                )
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            # 요청 순서대로 결과 분배
+            offset = 0
+            for item_texts, future in batch:
+                if not future.done():
+                    future.set_result(embeddings[offset:offset + len(item_texts)])
+                offset += len(item_texts)
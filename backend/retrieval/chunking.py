@@ -0,0 +1,52 @@
+from functools import lru_cache
+from typing import List, Dict, Any
+import tiktoken
+from backend.config import settings
+
+@lru_cache(maxsize=None)
+def _get_encoding(encoding_name: str) -> tiktoken.Encoding:
+    return tiktoken.get_encoding(encoding_name)
+
+def chunk_text(
+    text: str,
+    chunk_tokens: int = None,
+    overlap_tokens: int = None,
+    max_chunks: int = None
+) -> List[str]:
+    """텍스트를 겹치는 토큰 윈도우 단위 청크로 분할"""
+    chunk_tokens = chunk_tokens or settings.CHUNK_TOKENS
+    overlap_tokens = settings.CHUNK_OVERLAP_TOKENS if overlap_tokens is None else overlap_tokens
+    max_chunks = max_chunks or settings.MAX_CHUNKS_PER_TEST
+
+    encoding = _get_encoding(settings.CHUNK_ENCODING)
+    tokens = encoding.encode(text)
+
+    # 윈도우를 (chunk_tokens - overlap_tokens)씩 이동하며 최대 max_chunks개까지 생성
+    stride = max(chunk_tokens - overlap_tokens, 1)
+    chunks = []
+    for start in range(0, len(tokens), stride):
+        chunk = encoding.decode(tokens[start:start + chunk_tokens]).strip()
+        if chunk:
+            chunks.append(chunk)
+        if len(chunks) >= max_chunks or start + chunk_tokens >= len(tokens):
+            break
+
+    return chunks
+
+def pack_context(docs: List[Dict[str, Any]], token_budget: int = None) -> List[str]:
+    """유사도가 높은 문서부터 토큰 예산 안에 들어가도록 내용을 채움 (마지막 문서는 잘라서 포함)"""
+    token_budget = token_budget or settings.LLM_CONTEXT_TOKENS
+    encoding = _get_encoding(settings.CHUNK_ENCODING)
+
+    parts = []
+    used = 0
+    for doc in sorted(docs, key=lambda d: d["similarity"], reverse=True):
+        tokens = encoding.encode(doc["content"])
+        if used + len(tokens) > token_budget:
+            tokens = tokens[:token_budget - used]
+        parts.append(encoding.decode(tokens))
+        used += len(tokens)
+        if used >= token_budget:
+            break
+
+    return parts
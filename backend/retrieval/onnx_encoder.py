@@ -0,0 +1,67 @@
+from typing import List
+import numpy as np
+from transformers import AutoTokenizer
+from backend.config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+# CLS 토큰 풀링을 사용하는 모델 (그 외는 평균 풀링)
+CLS_POOLING_MODELS = {
+    "BAAI/bge-large-en-v1.5",
+    "BAAI/bge-base-en-v1.5",
+}
+
+class OnnxEncoder:
+    """ONNX Runtime 세션으로 실행하는 문장 임베딩 인코더 (SentenceTransformer.encode와 같은 인터페이스)"""
+
+    def __init__(self, model_name: str, device: str = "cpu"):
+        # optimum은 ONNX 백엔드를 사용할 때만 필요
+        from optimum.onnxruntime import ORTModelForFeatureExtraction
+
+        provider = "CUDAExecutionProvider" if device == "cuda" else "CPUExecutionProvider"
+        self.model_name = model_name
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name, token=settings.HUGGINGFACE_API_KEY)
+        self.model = ORTModelForFeatureExtraction.from_pretrained(
+            model_name, export=True, provider=provider, token=settings.HUGGINGFACE_API_KEY
+        )
+        self.pooling = "cls" if model_name in CLS_POOLING_MODELS else "mean"
+        logger.info(f"Exported {model_name} to ONNX Runtime ({provider})")
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        inputs = self.tokenizer(texts, return_tensors="np", padding=True, truncation=True)
+        hidden = self.model(**inputs).last_hidden_state
+        hidden = np.asarray(hidden, dtype=np.float32)
+
+        if self.pooling == "cls":
+            pooled = hidden[:, 0]
+        else:
+            # 패딩 토큰을 제외한 평균 풀링
+            mask = inputs["attention_mask"][..., None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        return pooled / np.maximum(norms, 1e-12)
+
+    def encode(self, texts, batch_size: int = 32, convert_to_numpy: bool = True,
+               **kwargs) -> np.ndarray:
+        """텍스트(또는 텍스트 목록)를 L2 정규화된 float32 임베딩으로 변환"""
+        single = isinstance(texts, str)
+        if single:
+            texts = [texts]
+
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+
+        # 길이순으로 정렬해 비슷한 길이끼리 배치하면 배치별 패딩이 최소화됨
+        sort_idx = np.argsort([-len(text) for text in texts], kind="stable")
+        sorted_texts = [texts[i] for i in sort_idx]
+        batches = [
+            self._encode_batch(sorted_texts[start:start + batch_size])
+            for start in range(0, len(sorted_texts), batch_size)
+        ]
+
+        # 원래 입력 순서로 되돌림
+        embeddings = np.empty((len(texts), batches[0].shape[1]), dtype=np.float32)
+        embeddings[sort_idx] = np.concatenate(batches)
+        return embeddings[0] if single else embeddings
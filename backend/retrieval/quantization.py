@@ -0,0 +1,136 @@
+import json
+import threading
+import time
+from typing import List, Optional, Tuple, Union
+import numpy as np
+from sqlalchemy.orm import Session
+from sqlalchemy import text
+
+from db.models import EmbeddingCalibration as EmbeddingCalibrationModel
+from backend.config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+def parse_vector(value: Union[str, List[float], np.ndarray]) -> np.ndarray:
+    """pgvector 텍스트 표현('[1,2,3]') 또는 리스트를 float32 배열로 변환"""
+    if isinstance(value, str):
+        value = json.loads(value)
+    return np.asarray(value, dtype=np.float32)
+
+def format_halfvec(value: Union[List[float], np.ndarray]) -> str:
+    """리스트/배열을 FP16으로 반올림해 pgvector halfvec 텍스트 표현으로 변환 (FP16 최단 표기로 전송량 감소)"""
+    return "[" + ",".join(map(str, np.asarray(value, dtype=np.float16))) + "]"
+
+def calibrate_int8(embeddings: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """샘플 임베딩으로 차원별 최소값과 스케일 계산"""
+    mins = embeddings.min(axis=0).astype(np.float32)
+    maxs = embeddings.max(axis=0).astype(np.float32)
+    scales = (maxs - mins) / 255.0
+    scales[scales == 0] = 1.0
+    return mins, scales
+
+def quantize_int8(embeddings: np.ndarray, mins: np.ndarray, scales: np.ndarray) -> np.ndarray:
+    """q = clamp(round((x - min) / scale), 0, 255) 스칼라 양자화"""
+    codes = np.rint((embeddings - mins) / scales)
+    return np.clip(codes, 0, 255).astype(np.uint8)
+
+def binary_quantize(embeddings: np.ndarray) -> np.ndarray:
+    """부호 비트를 8개씩 묶은 1비트 코드 (FAISS 바이너리 인덱스 입력 형식)"""
+    return np.packbits(embeddings > 0, axis=-1)
+
+class Int8Quantizer:
+    """문서 임베딩을 차원별 범위로 보정하여 8비트 코드로 변환"""
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+        self.mins: Optional[np.ndarray] = None
+        self.scales: Optional[np.ndarray] = None
+        self._lock = threading.Lock()
+        self._missing_checked_at: Optional[float] = None  # 보정 범위가 없음을 마지막으로 확인한 시각
+
+    @property
+    def calibrated(self) -> bool:
+        return self.mins is not None
+
+    def load(self, db: Session, force: bool = False) -> bool:
+        """저장된 보정 범위 로드 (없으면 CALIBRATION_RECHECK_SECONDS 동안 다시 조회하지 않음)"""
+        if self.calibrated:
+            return True
+        if (not force and self._missing_checked_at is not None
+                and time.monotonic() - self._missing_checked_at < settings.CALIBRATION_RECHECK_SECONDS):
+            return False
+
+        calibration = db.query(EmbeddingCalibrationModel).filter(
+            EmbeddingCalibrationModel.model_name == self.model_name
+        ).first()
+        if calibration:
+            self.mins = np.asarray(calibration.mins, dtype=np.float32)
+            self.scales = np.asarray(calibration.scales, dtype=np.float32)
+        else:
+            self._missing_checked_at = time.monotonic()
+
+        return self.calibrated
+
+    def ensure_calibrated(self, db: Session) -> bool:
+        """보정 범위가 없으면 기존 청크 임베딩 샘플로 한 번 보정하고 코드 채우기 (db.init 및 청크 저장 후 실행)"""
+        with self._lock:
+            if self.load(db, force=True):
+                return True
+
+            rows = db.execute(text("""
+                SELECT embedding FROM document_chunks
+                WHERE embedding IS NOT NULL
+                ORDER BY random()
+                LIMIT :sample_size
+            """), {"sample_size": settings.QUANTIZATION_SAMPLE_SIZE}).fetchall()
+            # 샘플이 너무 적으면 차원별 범위가 좁게 잡혀 이후 청크가 잘리므로 충분히 쌓일 때까지 대기
+            if len(rows) < settings.QUANTIZATION_MIN_SAMPLES:
+                return False
+
+            sample = np.stack([parse_vector(row.embedding) for row in rows])
+            self.mins, self.scales = calibrate_int8(sample)
+
+            db.add(EmbeddingCalibrationModel(
+                model_name=self.model_name,
+                mins=self.mins.tolist(),
+                scales=self.scales.tolist()
+            ))
+            self._backfill(db)
+            db.commit()
+
+            logger.info(f"INT8 calibration for {self.model_name} built from {len(rows)} embeddings")
+            return True
+
+    def _backfill(self, db: Session):
+        """코드가 없는 문서 청크의 INT8 임베딩을 한 번의 UPDATE로 채우기"""
+        rows = db.execute(text("""
+            SELECT id, embedding FROM document_chunks
+            WHERE embedding IS NOT NULL AND embedding_i8 IS NULL
+        """)).fetchall()
+        if not rows:
+            return
+
+        codes = self.quantize(np.stack([parse_vector(row.embedding) for row in rows]))
+        db.execute(text("""
+            UPDATE document_chunks c SET embedding_i8 = v.code
+            FROM unnest(CAST(:ids AS uuid[]), CAST(:codes AS bytea[])) AS v(id, code)
+            WHERE c.id = v.id
+        """), {"ids": [str(row.id) for row in rows], "codes": [code.tobytes() for code in codes]})
+
+    def quantize(self, embedding: Union[List[float], np.ndarray]) -> np.ndarray:
+        return quantize_int8(np.asarray(embedding, dtype=np.float32), self.mins, self.scales)
+
+    def encode(self, db: Session, embedding: List[float]) -> Optional[bytes]:
+        """보정된 경우 새 청크 임베딩의 INT8 코드 반환"""
+        if settings.QUANTIZATION != "int8" or not self.load(db):
+            return None
+        return self.quantize(embedding).tobytes()
+
+    def scores(self, codes: np.ndarray, query_embedding: List[float]) -> np.ndarray:
+        """역양자화 없이 코드와 float 쿼리의 근사 내적 계산 (ADC)"""
+        query = np.asarray(query_embedding, dtype=np.float32)
+        # x ≈ min + q * scale  =>  x·y ≈ min·y + q·(scale * y)
+        return codes @ (self.scales * query) + float(self.mins @ query)
+
+int8_quantizer = Int8Quantizer(settings.DEFAULT_EMBEDDING_MODEL)
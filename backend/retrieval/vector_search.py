@@ -1,184 +1,573 @@
+import gc
+import hashlib
+import math
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 import faiss
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple, Union
 from sqlalchemy.orm import Session
 from sqlalchemy import text
-import openai
+from openai import OpenAI
 import cohere
 from sentence_transformers import SentenceTransformer
+import torch
 from backend.config import settings
+from backend.retrieval.quantization import int8_quantizer, binary_quantize, format_halfvec
+from backend.retrieval.batching import EmbeddingBatcher
+from backend.retrieval.onnx_encoder import OnnxEncoder
 import logging
 
 logger = logging.getLogger(__name__)
 
+# 배치 임베딩 호출당 최대 입력 개수
+OPENAI_MAX_BATCH = 2048
+COHERE_MAX_BATCH = 96
+HF_ENCODE_BATCH_SIZE = 64
+
+# 청크 단위 k-NN 후 문서별 최고 유사도 청크로 집계하는 SQL
+# ($1: 쿼리 벡터, $2: 반환할 문서 수, $3: 집계 전 청크 후보 수)
+# 결과 행을 그대로 응답 dict로 쓸 수 있도록 id는 text로 변환해 반환
+CHUNK_KNN_SQL = """
+    SELECT CAST(d.id AS text) AS id, d.filename, c.content, c.similarity
+    FROM (
+        SELECT DISTINCT ON (document_id) document_id, content, similarity
+        FROM (
+            SELECT document_id, content, 1 - (embedding <=> {vector}) AS similarity
+            FROM document_chunks
+            WHERE {filter}
+            ORDER BY embedding <=> {vector}
+            LIMIT {candidates}
+        ) candidates
+        ORDER BY document_id, similarity DESC
+    ) c
+    JOIN documents d ON d.id = c.document_id
+    ORDER BY c.similarity DESC
+    LIMIT {top_k}
+"""
+
+# 커넥션별 준비 구문: 벡터는 halfvec 타입 파라미터로 바인딩되어 매번 파싱/계획하지 않음
+CHUNK_KNN_PREPARE = "PREPARE chunk_knn (halfvec, int, int) AS" + CHUNK_KNN_SQL.format(
+    vector="$1", filter="embedding IS NOT NULL", candidates="$3", top_k="$2"
+)
+
+# 임베딩 전처리/정규화 방식이 바뀌면 올려서 이전 캐시 항목 무효화
+EMBEDDING_CACHE_VERSION = 2
+
+class ModelLRU(OrderedDict):
+    """최근 사용한 HuggingFace 모델만 메모리에 유지하는 LRU 캐시"""
+    
+    def __init__(self, max_size: int):
+        super().__init__()
+        self.max_size = max_size
+    
+    def __getitem__(self, key):
+        value = super().__getitem__(key)
+        self.move_to_end(key)
+        return value
+    
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+    
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self.move_to_end(key)
+        self._evict()
+    
+    def _evict(self):
+        """한도를 넘으면 가장 오래 사용하지 않은 모델을 내리고 GPU/CPU 메모리 반환"""
+        evicted = False
+        while len(self) > self.max_size:
+            model_name, model = self.popitem(last=False)
+            del model
+            evicted = True
+            logger.info(f"Unloaded embedding model {model_name}")
+        if evicted:
+            gc.collect()
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+
+def corpus_hash(documents: List[str]) -> str:
+    """문서 목록(순서 포함)의 SHA-256 지문"""
+    digest = hashlib.sha256()
+    for document in documents:
+        digest.update(hashlib.sha256(document.encode("utf-8")).digest())
+    return digest.hexdigest()
+
 class EmbeddingGenerator:
     """다양한 임베딩 모델을 지원하는 클래스"""
     
     def __init__(self):
         self.models = {}
+        self._hf_models = ModelLRU(max(1, settings.MAX_RESIDENT_MODELS))
+        self._hf_lock = threading.Lock()
+        self._emb_cache: "OrderedDict[Tuple[str, int, bytes], np.ndarray]" = OrderedDict()
+        self._corpus_cache: "OrderedDict[Tuple[str, str], np.ndarray]" = OrderedDict()
+        self._cache_lock = threading.Lock()
         self._initialize_models()
     
     def _initialize_models(self):
         """사용 가능한 임베딩 모델들을 초기화"""
         try:
             if settings.OPENAI_API_KEY:
-                openai.api_key = settings.OPENAI_API_KEY
+                self.openai_client = OpenAI(api_key=settings.OPENAI_API_KEY)
                 self.models["text-embedding-ada-002"] = "openai"
             
             if settings.COHERE_API_KEY:
                 self.cohere_client = cohere.Client(settings.COHERE_API_KEY)
                 self.models["cohere-embed-v3"] = "cohere"
             
-            if settings.HUGGINGFACE_API_KEY:
-                # HuggingFace 모델들 초기화
-                self.models["BAAI/bge-large-en-v1.5"] = "hf"
-                self.models["BAAI/bge-base-en-v1.5"] = "hf"
-                self.models["intfloat/e5-large-v2"] = "hf"
-                self.models["intfloat/e5-base-v2"] = "hf"
-                self.models["sentence-transformers/all-MiniLM-L6-v2"] = "hf"
-                
+            # HuggingFace 모델들은 이름만 등록하고 첫 사용 시 로드 (공개 모델은 토큰 불필요)
+            self.models["BAAI/bge-large-en-v1.5"] = "hf"
+            self.models["BAAI/bge-base-en-v1.5"] = "hf"
+            self.models["intfloat/e5-large-v2"] = "hf"
+            self.models["intfloat/e5-base-v2"] = "hf"
+            self.models["sentence-transformers/all-MiniLM-L6-v2"] = "hf"
+            
         except Exception as e:
             logger.error(f"Error initializing embedding models: {e}")
     
+    def _get_hf_model(self, model_name: str) -> Union[SentenceTransformer, OnnxEncoder]:
+        """HuggingFace 모델을 첫 사용 시 로드 (MAX_RESIDENT_MODELS를 넘으면 오래된 모델부터 해제)"""
+        # 조회도 LRU 순서를 바꾸므로 잠금 안에서 수행
+        with self._hf_lock:
+            model = self._hf_models.get(model_name)
+            if model is None:
+                device = "cuda" if torch.cuda.is_available() else "cpu"
+                if settings.EMBEDDING_BACKEND == "onnx":
+                    model = OnnxEncoder(model_name, device)
+                else:
+                    model = SentenceTransformer(
+                        model_name, device=device, use_auth_token=settings.HUGGINGFACE_API_KEY
+                    )
+                    model.eval()
+                    model = self._apply_precision(model, device)
+                self._hf_models[model_name] = model
+                logger.info(f"Loaded embedding model {model_name}")
+        return model
+    
+    def _apply_precision(self, model: SentenceTransformer, device: str) -> SentenceTransformer:
+        """EMBEDDING_PRECISION에 따라 가중치 정밀도 변경 (auto: GPU는 FP16, CPU는 INT8)"""
+        precision = settings.EMBEDDING_PRECISION
+        if precision == "auto":
+            precision = "fp16" if device == "cuda" else "int8"
+        
+        if precision == "fp16" and device == "cuda":
+            return model.half()
+        if precision == "int8" and device == "cpu":
+            # Linear 가중치를 INT8로 동적 양자화 (활성값은 실행 시 양자화), 출력은 float32 유지
+            return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        return model
+    
+    def preload(self, model_names: List[str]):
+        """지정한 HuggingFace 모델을 미리 로드 (첫 요청에서 가중치 로딩 지연 제거)"""
+        if len(model_names) > self._hf_models.max_size:
+            logger.warning(
+                f"Preloading {len(model_names)} models but only {self._hf_models.max_size} stay resident"
+            )
+        for model_name in model_names:
+            if self.models.get(model_name) == "hf":
+                self._get_hf_model(model_name)
+            else:
+                logger.warning(f"Skipping preload of unavailable HF model {model_name}")
+    
+    def _cache_key(self, text: str, model_name: str) -> Tuple[str, int, bytes]:
+        # 모델명 + 캐시 버전(전처리/정규화 변경 시 증가) + 텍스트 해시
+        return (model_name, EMBEDDING_CACHE_VERSION, hashlib.sha256(text.encode("utf-8")).digest())
+    
+    def _encode(self, texts: List[str], model_name: str) -> np.ndarray:
+        """모델 유형별 배치 호출로 L2 정규화된 float32 임베딩 행렬 생성"""
+        model_type = self.models[model_name]
+        
+        if model_type == "openai":
+            # API의 요청당 입력 개수 제한 단위로 나누어 호출
+            embeddings = []
+            for start in range(0, len(texts), OPENAI_MAX_BATCH):
+                response = self.openai_client.embeddings.create(
+                    input=texts[start:start + OPENAI_MAX_BATCH],
+                    model=model_name
+                )
+                embeddings.extend(item.embedding for item in response.data)
+        
+        elif model_type == "cohere":
+            embeddings = []
+            for start in range(0, len(texts), COHERE_MAX_BATCH):
+                response = self.cohere_client.embed(
+                    texts=texts[start:start + COHERE_MAX_BATCH],
+                    model=model_name
+                )
+                embeddings.extend(response.embeddings)
+        
+        elif model_type == "hf":
+            # 인코딩과 함께 (GPU에서) L2 정규화
+            return self._get_hf_model(model_name).encode(
+                texts, batch_size=HF_ENCODE_BATCH_SIZE, convert_to_numpy=True, normalize_embeddings=True
+            ).astype(np.float32, copy=False)
+        
+        # API 응답은 한 번의 벡터화된 연산으로 제자리 L2 정규화
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        embeddings /= np.maximum(norms, 1e-12)
+        return embeddings
+    
+    def _get_cached_embeddings(self, texts: List[str], model_name: str) -> np.ndarray:
+        """캐시에 없는 텍스트만 인코딩하고 (모델, 텍스트 해시)별로 LRU 캐시에 저장"""
+        keys = [self._cache_key(text, model_name) for text in texts]
+        
+        with self._cache_lock:
+            rows = [self._emb_cache.get(key) for key in keys]
+            for key, row in zip(keys, rows):
+                if row is not None:
+                    self._emb_cache.move_to_end(key)
+        
+        missing = list(dict.fromkeys(text for text, row in zip(texts, rows) if row is None))
+        if missing:
+            computed = dict(zip(missing, self._encode(missing, model_name)))
+            with self._cache_lock:
+                for i, (text, key) in enumerate(zip(texts, keys)):
+                    if rows[i] is None:
+                        # 배치 행렬 전체가 캐시에 붙잡히지 않도록 행 단위로 복사
+                        rows[i] = self._emb_cache[key] = computed[text].copy()
+                while len(self._emb_cache) > settings.EMBEDDING_CACHE_SIZE:
+                    self._emb_cache.popitem(last=False)
+        
+        return np.stack(rows)
+    
     def get_embedding(self, text: str, model_name: str = "text-embedding-ada-002") -> List[float]:
         """텍스트를 임베딩 벡터로 변환"""
         try:
             if model_name not in self.models:
                 raise ValueError(f"Model {model_name} not available")
             
-            model_type = self.models[model_name]
-            
-            if model_type == "openai":
-                response = openai.Embedding.create(
-                    input=text,
-                    model=model_name
-                )
-                return response['data'][0]['embedding']
+            return self._get_cached_embeddings([text], model_name)[0].tolist()
             
-            elif model_type == "cohere":
-                response = self.cohere_client.embed(
-                    texts=[text],
-                    model=model_name
-                )
-                return response.embeddings[0]
+        except Exception as e:
+            logger.error(f"Error generating embedding with {model_name}: {e}")
+            raise
+    
+    def get_embeddings(self, texts: List[str], model_name: str = "text-embedding-ada-002") -> np.ndarray:
+        """여러 텍스트를 한 번의 호출로 L2 정규화된 float32 임베딩 행렬로 변환 (FP16은 저장/인덱스 단계에서만 적용)"""
+        try:
+            if model_name not in self.models:
+                raise ValueError(f"Model {model_name} not available")
             
-            elif model_type == "hf":
-                if model_name not in self._hf_models:
-                    self._hf_models[model_name] = SentenceTransformer(model_name)
-                
-                embedding = self._hf_models[model_name].encode(text)
-                return embedding.tolist()
+            return self._get_cached_embeddings(texts, model_name)
             
         except Exception as e:
-            logger.error(f"Error generating embedding with {model_name}: {e}")
+            logger.error(f"Error generating embeddings with {model_name}: {e}")
             raise
     
+    def embed_corpus(self, documents: List[str], model_name: str) -> np.ndarray:
+        """문서 목록의 L2 정규화된 float32 임베딩 행렬 (같은 문서 목록은 모델별로 한 번만 계산)"""
+        key = (model_name, corpus_hash(documents))
+        with self._cache_lock:
+            matrix = self._corpus_cache.get(key)
+            if matrix is not None:
+                self._corpus_cache.move_to_end(key)
+                return matrix
+        
+        matrix = self._get_cached_embeddings(documents, model_name)
+        
+        with self._cache_lock:
+            self._corpus_cache[key] = matrix
+            while len(self._corpus_cache) > settings.CORPUS_CACHE_SIZE:
+                self._corpus_cache.popitem(last=False)
+        return matrix
+    
     def get_dimension(self, model_name: str) -> int:
         """모델의 임베딩 차원 수 반환"""
         return settings.EMBEDDING_DIMENSIONS.get(model_name, 1536)
 
+class BinaryRescoreIndex:
+    """1비트 부호 코드의 해밍 거리로 후보를 고른 뒤 float32 내적으로 재정렬 (faiss.Index와 같은 search 인터페이스)"""
+    
+    def __init__(self, doc_embeddings_np: np.ndarray):
+        self.embeddings = doc_embeddings_np
+        self.ntotal, dimension = doc_embeddings_np.shape
+        self.binary_index = faiss.IndexBinaryFlat(dimension)
+        self.binary_index.add(binary_quantize(doc_embeddings_np))
+    
+    def search(self, query_embedding_np: np.ndarray, top_k: int):
+        # 1단계: 64차원당 POPCNT 한 번으로 해밍 거리 계산
+        num_candidates = min(top_k * settings.RESCORE_MULTIPLIER, self.ntotal)
+        _, candidates = self.binary_index.search(binary_quantize(query_embedding_np), num_candidates)
+        candidates = candidates[0][candidates[0] >= 0]
+        
+        # 2단계: 후보만 정확한 내적으로 재정렬
+        candidate_scores = self.embeddings[candidates] @ query_embedding_np[0]
+        order = np.argsort(-candidate_scores)[:top_k]
+        return candidate_scores[order][None, :], candidates[order][None, :]
+
 class VectorSearch:
     """벡터 검색 기능을 제공하는 클래스"""
     
     def __init__(self):
         self.embedding_generator = EmbeddingGenerator()
+        self.batcher = EmbeddingBatcher(self.embedding_generator)
+        self._index_cache: "OrderedDict[Tuple[str, str, str], faiss.Index]" = OrderedDict()
+        self._index_lock = threading.Lock()
     
     def search_pgvector(self, db: Session, query: str, model_name: str = "text-embedding-ada-002", 
-                       top_k: int = 5) -> List[Dict[str, Any]]:
+                       top_k: int = 5, query_embedding: Optional[List[float]] = None) -> List[Dict[str, Any]]:
         """PostgreSQL pgvector를 사용한 벡터 검색"""
         try:
-            # 쿼리 임베딩 생성
-            query_embedding = self.embedding_generator.get_embedding(query, model_name)
-            
-            # pgvector를 사용한 유사도 검색
-            sql = text("""
-                SELECT id, filename, content, 
-                       1 - (embedding <=> :embedding) as similarity
-                FROM documents 
-                WHERE embedding IS NOT NULL
-                ORDER BY embedding <=> :embedding
-                LIMIT :top_k
-            """)
-            
-            result = db.execute(sql, {
-                "embedding": query_embedding,
-                "top_k": top_k
-            })
+            # 쿼리 임베딩 생성 (호출자가 이미 계산한 경우 재사용)
+            if query_embedding is None:
+                query_embedding = self.embedding_generator.get_embedding(query, model_name)
             
-            documents = []
-            for row in result:
-                documents.append({
-                    "id": str(row.id),
-                    "filename": row.filename,
-                    "content": row.content,
-                    "similarity": float(row.similarity)
-                })
+            # 이진/INT8 코드로 후보를 좁힌 뒤 정확한 유사도로 재정렬 (보정은 db.init에서 수행)
+            if settings.QUANTIZATION == "int8" and int8_quantizer.load(db):
+                return self._search_pgvector_int8(db, query_embedding, top_k)
             
-            return documents
+            # 커넥션별로 한 번 준비한 구문으로 청크 검색 후 문서별 집계 (매 요청 파싱/계획 생략)
+            self._prepare_knn(db)
+            result = db.execute(text("EXECUTE chunk_knn(:embedding, :top_k, :candidates)"), {
+                "embedding": format_halfvec(query_embedding),
+                "top_k": top_k,
+                "candidates": top_k * settings.CHUNK_SEARCH_MULTIPLIER
+            })
+            
+            return [dict(row) for row in result.mappings()]
             
         except Exception as e:
             logger.error(f"Error in pgvector search: {e}")
             raise
     
+    def _prepare_knn(self, db: Session):
+        """현재 DB 커넥션에 k-NN 검색 구문이 준비되어 있지 않으면 PREPARE"""
+        connection = db.connection()
+        if not connection.info.get("chunk_knn_prepared"):
+            connection.exec_driver_sql(CHUNK_KNN_PREPARE)
+            connection.info["chunk_knn_prepared"] = True
+    
+    def _search_pgvector_int8(self, db: Session, query_embedding: List[float], 
+                              top_k: int) -> List[Dict[str, Any]]:
+        """이진 코드 해밍 거리 1차 검색(SQL) + INT8 ADC 재정렬 + 정확한 유사도 집계"""
+        num_candidates = top_k * settings.CHUNK_SEARCH_MULTIPLIER
+        num_prefilter = num_candidates * settings.RESCORE_MULTIPLIER
+        
+        # 1단계: 이진 양자화 HNSW 인덱스로 해밍 거리 후보만 가져옴 (HNSW는 ef_search개까지만 반환하므로 트랜잭션 내에서 확대)
+        db.execute(text("SELECT set_config('hnsw.ef_search', :ef_search, true)"), {
+            "ef_search": str(max(settings.HNSW_EF_SEARCH, num_prefilter))
+        })
+        rows = db.execute(text("""
+            SELECT id, embedding_i8 FROM document_chunks
+            WHERE embedding_i8 IS NOT NULL
+            ORDER BY binary_quantize(embedding)::bit(1536) <~> binary_quantize(CAST(:embedding AS halfvec))::bit(1536)
+            LIMIT :limit
+        """), {"embedding": format_halfvec(query_embedding), "limit": num_prefilter}).fetchall()
+        if not rows:
+            return []
+        
+        # 2단계: 후보의 INT8 코드로만 근사 점수를 계산해 청크 후보 선택
+        codes = np.frombuffer(b"".join(row.embedding_i8 for row in rows), dtype=np.uint8)
+        codes = codes.reshape(len(rows), -1)
+        scores = int8_quantizer.scores(codes, query_embedding)
+        
+        num_candidates = min(num_candidates, len(rows))
+        candidates = np.argpartition(-scores, num_candidates - 1)[:num_candidates]
+        candidate_ids = [str(rows[i].id) for i in candidates]
+        
+        # 3단계: 후보 청크만 halfvec 임베딩으로 정확한 코사인 유사도 재계산 후 문서별 집계
+        result = db.execute(text(CHUNK_KNN_SQL.format(
+            vector="CAST(:embedding AS halfvec)",
+            filter="id = ANY(CAST(:ids AS uuid[]))",
+            candidates=":candidates",
+            top_k=":top_k"
+        )), {
+            "embedding": format_halfvec(query_embedding),
+            "ids": candidate_ids,
+            "candidates": num_candidates,
+            "top_k": top_k
+        })
+        
+        return [dict(row) for row in result.mappings()]
+    
     def search_faiss(self, documents: List[str], query: str, 
                     model_name: str = "text-embedding-ada-002", 
-                    top_k: int = 5) -> List[Dict[str, Any]]:
-        """FAISS를 사용한 벡터 검색 (테스트용)"""
+                    top_k: int = 5, index: Optional[faiss.Index] = None,
+                    index_type: Optional[str] = None) -> List[Dict[str, Any]]:
+        """FAISS를 사용한 벡터 검색 (테스트용, index를 넘기면 문서 임베딩 생략)"""
         try:
-            # 문서들 임베딩 생성
-            doc_embeddings = []
-            for doc in documents:
-                embedding = self.embedding_generator.get_embedding(doc, model_name)
-                doc_embeddings.append(embedding)
-            
-            # FAISS 인덱스 생성
-            dimension = self.embedding_generator.get_dimension(model_name)
-            index = faiss.IndexFlatIP(dimension)  # Inner Product for cosine similarity
-            
-            # 정규화된 벡터로 인덱스 생성
-            doc_embeddings_np = np.array(doc_embeddings, dtype=np.float32)
-            faiss.normalize_L2(doc_embeddings_np)
-            index.add(doc_embeddings_np)
+            if index is None:
+                index = self._get_cached_index(documents, model_name, index_type)
+            if index is not None:
+                query_embedding_np = self.embedding_generator.get_embeddings([query], model_name)
+                return self._rank_faiss(documents, None, query_embedding_np, model_name, top_k, index)
             
-            # 쿼리 임베딩 생성 및 검색
-            query_embedding = self.embedding_generator.get_embedding(query, model_name)
-            query_embedding_np = np.array([query_embedding], dtype=np.float32)
-            faiss.normalize_L2(query_embedding_np)
+            # 문서들과 쿼리를 한 번의 배치 호출로 임베딩
+            embeddings = self.embedding_generator.get_embeddings(documents + [query], model_name)
+            doc_embeddings_np, query_embedding_np = embeddings[:-1], embeddings[-1:]
             
-            similarities, indices = index.search(query_embedding_np, top_k)
+            return self._rank_faiss(documents, doc_embeddings_np, query_embedding_np, model_name, top_k,
+                                    index_type=index_type)
             
-            # 결과 반환
-            results = []
-            for i, (similarity, idx) in enumerate(zip(similarities[0], indices[0])):
-                if idx < len(documents):
-                    results.append({
-                        "index": int(idx),
-                        "content": documents[idx],
-                        "similarity": float(similarity)
-                    })
+        except Exception as e:
+            logger.error(f"Error in FAISS search: {e}")
+            raise
+    
+    async def asearch_faiss(self, documents: List[str], query: str, 
+                           model_name: str = "text-embedding-ada-002", 
+                           top_k: int = 5, index: Optional[faiss.Index] = None) -> List[Dict[str, Any]]:
+        """FAISS 검색의 비동기 버전 (동시 요청의 임베딩 호출을 모델별 배치로 묶음)"""
+        try:
+            if index is None:
+                index = self._get_cached_index(documents, model_name)
+            if index is not None:
+                query_embedding_np = await self.batcher.encode([query], model_name)
+                return self._rank_faiss(documents, None, query_embedding_np, model_name, top_k, index)
             
-            return results
+            embeddings = await self.batcher.encode(documents + [query], model_name)
+            return self._rank_faiss(documents, embeddings[:-1], embeddings[-1:], model_name, top_k)
             
         except Exception as e:
             logger.error(f"Error in FAISS search: {e}")
             raise
     
+    def build_faiss_index(self, doc_embeddings_np: np.ndarray, model_name: str,
+                          index_type: Optional[str] = None) -> Union[faiss.Index, BinaryRescoreIndex]:
+        """정규화된 문서 임베딩으로 내적 FAISS 인덱스 생성 (임베딩은 생성 시 이미 정규화됨)"""
+        doc_embeddings_np = np.ascontiguousarray(doc_embeddings_np, dtype=np.float32)
+        num_docs, dimension = doc_embeddings_np.shape
+        index_type = index_type or settings.FAISS_INDEX_TYPE
+        
+        use_ivfpq = index_type == "ivfpq" or (
+            index_type == "auto" and num_docs >= settings.FAISS_IVFPQ_MIN_DOCS
+        )
+        if use_ivfpq and dimension % settings.FAISS_PQ_M == 0:
+            # 코스 양자화로 nprobe개 클러스터만 탐색하고 벡터는 M바이트 PQ 코드로 저장
+            # (1536차원 float32 6144B/벡터 -> M=32이면 32B/벡터)
+            nlist = max(1, int(4 * math.sqrt(num_docs)))
+            quantizer = faiss.IndexFlatIP(dimension)
+            index = faiss.IndexIVFPQ(
+                quantizer, dimension, nlist, settings.FAISS_PQ_M, 8, faiss.METRIC_INNER_PRODUCT
+            )
+            index.train(doc_embeddings_np)
+            index.nprobe = settings.FAISS_NPROBE
+        elif settings.FAISS_BINARY_PREFILTER:
+            # 이진 코드 인덱스도 다른 인덱스와 같이 (문서 목록, 모델)별로 캐시되어 쿼리마다 다시 만들지 않음
+            return BinaryRescoreIndex(doc_embeddings_np)
+        elif settings.EMBEDDING_DTYPE == "float16":
+            # 벡터를 FP16으로 저장해 검색 시 메모리 대역폭 절반
+            index = faiss.IndexScalarQuantizer(
+                dimension, faiss.ScalarQuantizer.QT_fp16, faiss.METRIC_INNER_PRODUCT
+            )
+        else:
+            index = faiss.IndexFlatIP(dimension)  # Inner Product for cosine similarity
+        index.add(doc_embeddings_np)
+        return index
+    
+    def _index_key(self, documents: List[str], model_name: str,
+                   index_type: Optional[str] = None) -> Tuple[str, str, str]:
+        return (corpus_hash(documents), model_name, index_type or settings.FAISS_INDEX_TYPE)
+    
+    def _get_cached_index(self, documents: List[str], model_name: str,
+                          index_type: Optional[str] = None) -> Optional[faiss.Index]:
+        """같은 문서 목록/모델로 이미 만든 FAISS 인덱스 조회 (없으면 None)"""
+        key = self._index_key(documents, model_name, index_type)
+        with self._index_lock:
+            index = self._index_cache.get(key)
+            if index is not None:
+                self._index_cache.move_to_end(key)
+            return index
+    
+    def _get_or_build_index(self, documents: List[str], doc_embeddings_np: np.ndarray,
+                            model_name: str, index_type: Optional[str] = None) -> faiss.Index:
+        """FAISS 인덱스를 (문서 목록, 모델)별로 한 번만 만들고 이후 쿼리에서 재사용"""
+        key = self._index_key(documents, model_name, index_type)
+        with self._index_lock:
+            index = self._index_cache.get(key)
+            if index is not None:
+                self._index_cache.move_to_end(key)
+                return index
+        
+        index = self.build_faiss_index(doc_embeddings_np, model_name, index_type)
+        
+        with self._index_lock:
+            self._index_cache[key] = index
+            while len(self._index_cache) > settings.CORPUS_CACHE_SIZE:
+                self._index_cache.popitem(last=False)
+        return index
+    
+    def _rank_faiss(self, documents: List[str], doc_embeddings_np: Optional[np.ndarray], 
+                    query_embedding_np: np.ndarray, model_name: str, 
+                    top_k: int, index: Optional[faiss.Index] = None,
+                    index_type: Optional[str] = None) -> List[Dict[str, Any]]:
+        """임베딩 행렬(또는 미리 만든 인덱스)로 상위 K개 문서 반환"""
+        query_embedding_np = np.ascontiguousarray(query_embedding_np, dtype=np.float32)
+        
+        if index is not None:
+            similarities, indices = index.search(query_embedding_np, top_k)
+        elif (index_type is None and not settings.FAISS_BINARY_PREFILTER
+              and len(documents) < settings.NUMPY_SEARCH_MAX_DOCS):
+            # 작은 문서 집합은 인덱스 생성 없이 행렬-벡터 곱 한 번으로 검색 (이진 사전 필터를 켜면 항상 인덱스 사용)
+            similarities, indices = self._search_numpy(doc_embeddings_np, query_embedding_np, top_k)
+        else:
+            # FAISS 인덱스 생성(또는 캐시된 인덱스 재사용) 및 검색
+            index = self._get_or_build_index(documents, doc_embeddings_np, model_name, index_type)
+            similarities, indices = index.search(query_embedding_np, top_k)
+        
+        # 결과 반환
+        results = []
+        for i, (similarity, idx) in enumerate(zip(similarities[0], indices[0])):
+            if 0 <= idx < len(documents):
+                results.append({
+                    "index": int(idx),
+                    "content": documents[idx],
+                    "similarity": float(similarity)
+                })
+        
+        return results
+    
+    def _search_numpy(self, doc_embeddings_np: np.ndarray, query_embedding_np: np.ndarray, 
+                      top_k: int):
+        """정규화된 임베딩의 내적(코사인 유사도)을 numpy GEMV로 계산하고 argpartition으로 상위 K개 선택"""
+        doc_embeddings_np = np.asarray(doc_embeddings_np, dtype=np.float32)
+        similarities = doc_embeddings_np @ query_embedding_np[0]
+        
+        top_k = min(top_k, len(similarities))
+        if top_k == 0:
+            return np.empty((1, 0), dtype=np.float32), np.empty((1, 0), dtype=np.int64)
+        indices = np.argpartition(-similarities, top_k - 1)[:top_k]
+        indices = indices[np.argsort(-similarities[indices])]
+        return similarities[indices][None, :], indices[None, :]
+    
     def compare_models(self, documents: List[str], query: str, 
                       model_names: List[str] = None) -> Dict[str, List[Dict[str, Any]]]:
-        """여러 임베딩 모델의 성능을 비교"""
+        """여러 임베딩 모델의 성능을 비교 (모델별 검색은 스레드 풀에서 동시에 실행)"""
         if model_names is None:
             model_names = ["text-embedding-ada-002", "BAAI/bge-base-en-v1.5", "sentence-transformers/all-MiniLM-L6-v2"]
         
-        results = {}
+        available_models = [m for m in model_names if m in self.embedding_generator.models]
+        futures = {}
+        if available_models:
+            # API 호출(I/O 대기)과 PyTorch 연산은 GIL을 놓으므로 모델 수만큼 병렬 처리
+            with ThreadPoolExecutor(max_workers=len(available_models)) as executor:
+                futures = {
+                    model_name: executor.submit(self._compare_model, documents, query, model_name)
+                    for model_name in available_models
+                }
         
+        results = {}
         for model_name in model_names:
-            try:
-                if model_name in self.embedding_generator.models:
-                    faiss_results = self.search_faiss(documents, query, model_name)
-                    results[model_name] = faiss_results
-                else:
-                    results[model_name] = {"error": f"Model {model_name} not available"}
-            except Exception as e:
-                results[model_name] = {"error": str(e)}
+            future = futures.get(model_name)
+            if future is None:
+                results[model_name] = {"error": f"Model {model_name} not available"}
+            elif future.exception() is not None:
+                results[model_name] = {"error": str(future.exception())}
+            else:
+                results[model_name] = future.result()
         
-        return results 
\ No newline at end of file
+        return results
+    
+    def _compare_model(self, documents: List[str], query: str, model_name: str) -> List[Dict[str, Any]]:
+        """단일 모델의 상위 5개 검색 결과"""
+        # 인덱스가 캐시되어 있으면 쿼리만 임베딩해 바로 검색
+        index = self._get_cached_index(documents, model_name)
+        doc_embeddings_np = None
+        if index is None:
+            # 문서 행렬은 모델별로 캐시되어 같은 문서 목록의 반복 비교에서 재사용
+            doc_embeddings_np = self.embedding_generator.embed_corpus(documents, model_name)
+        query_embedding_np = self.embedding_generator.get_embeddings([query], model_name)
+        return self._rank_faiss(documents, doc_embeddings_np, query_embedding_np, model_name, 5, index)
@@ -1,96 +1,187 @@
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException
+from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, BackgroundTasks, Response
 from sqlalchemy.orm import Session
-from typing import List
+from sqlalchemy import text
+from typing import List, Tuple, BinaryIO, Optional
 import uuid
 import os
 from pathlib import Path
-import PyPDF2
+import pypdfium2 as pdfium
 from docx import Document
 import io
+import logging
 
-from db.database import get_db
-from db.models import Document as DocumentModel
-from backend.retrieval.vector_search import EmbeddingGenerator
+from db.database import get_db, SessionLocal
+from db.models import Document as DocumentModel, QACache as QACacheModel
+from backend.retrieval import get_embedding_generator
+from backend.retrieval.chunking import chunk_text
+from backend.retrieval.quantization import int8_quantizer, format_halfvec
+from backend.qa.semantic_cache import semantic_cache
 from backend.config import settings
 from backend.core.exception_handler import CustomAPIException
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/upload", tags=["upload"])
 
-embedding_generator = EmbeddingGenerator()
+UPLOAD_READ_CHUNK_SIZE = 1 << 20  # 1MB
+
+async def read_upload(file: UploadFile) -> io.BytesIO:
+    """업로드 파일을 청크 단위로 읽어 크기 제한을 넘는 즉시 중단"""
+    buffer = io.BytesIO()
+    total = 0
+    while chunk := await file.read(UPLOAD_READ_CHUNK_SIZE):
+        total += len(chunk)
+        if total > settings.MAX_FILE_SIZE:
+            raise CustomAPIException(
+                f"파일 크기가 너무 큽니다. 최대 크기: {settings.MAX_FILE_SIZE // (1024*1024)}MB"
+            )
+        buffer.write(chunk)
+    buffer.seek(0)
+    return buffer
 
-def extract_text_from_pdf(file_content: bytes) -> str:
+def extract_text_from_pdf(file_content: BinaryIO) -> str:
     """PDF 파일에서 텍스트 추출"""
     try:
-        pdf_reader = PyPDF2.PdfReader(io.BytesIO(file_content))
-        text = ""
-        for page in pdf_reader.pages:
-            text += page.extract_text() + "\n"
-        return text.strip()
+        # pdfium(C++) 기반 추출, 페이지 텍스트는 리스트로 모아 한 번에 결합
+        pdf = pdfium.PdfDocument(file_content)
+        try:
+            parts = [pdf[i].get_textpage().get_text_range() for i in range(len(pdf))]
+        finally:
+            pdf.close()
+        return "\n".join(parts).strip()
     except Exception as e:
         raise CustomAPIException(f"PDF 텍스트 추출 실패: {str(e)}")
 
-def extract_text_from_docx(file_content: bytes) -> str:
+def extract_text_from_docx(file_content: BinaryIO) -> str:
     """DOCX 파일에서 텍스트 추출"""
     try:
-        doc = Document(io.BytesIO(file_content))
-        text = ""
-        for paragraph in doc.paragraphs:
-            text += paragraph.text + "\n"
-        return text.strip()
+        doc = Document(file_content)
+        return "\n".join(paragraph.text for paragraph in doc.paragraphs).strip()
     except Exception as e:
         raise CustomAPIException(f"DOCX 텍스트 추출 실패: {str(e)}")
 
-@router.post("/")
-async def upload_file(
-    file: UploadFile = File(...),
-    db: Session = Depends(get_db)
-):
-    """파일 업로드 및 임베딩 생성"""
+def set_embedding_status(db: Session, document_ids: List[str], status: str, error: Optional[str] = None):
+    """문서들의 청크 임베딩 상태 갱신"""
+    db.execute(text("""
+        UPDATE documents SET embedding_status = :status, embedding_error = :error
+        WHERE id = ANY(CAST(:ids AS uuid[]))
+    """), {"status": status, "error": error, "ids": document_ids})
+
+def embed_documents(documents: List[Tuple[uuid.UUID, str]], model_name: str):
+    """문서들을 청크로 나누어 한 번에 배치 임베딩 후 저장하고 임베딩 상태 기록 (업로드 응답 후 백그라운드에서 실행)"""
+    document_ids = [str(document_id) for document_id, _ in documents]
+    db = SessionLocal()
     try:
-        # 파일 확장자 검증
-        file_extension = Path(file.filename).suffix.lower()
-        if file_extension not in settings.ALLOWED_EXTENSIONS:
-            raise CustomAPIException(
-                f"지원하지 않는 파일 형식입니다. 지원 형식: {', '.join(settings.ALLOWED_EXTENSIONS)}"
+        # 모델 입력 한도에서 잘리지 않도록 겹치는 토큰 윈도우로 분할
+        chunk_rows = []
+        for document_id, content in documents:
+            chunks = chunk_text(
+                content,
+                chunk_tokens=settings.DOCUMENT_CHUNK_TOKENS,
+                overlap_tokens=settings.DOCUMENT_CHUNK_OVERLAP_TOKENS,
+                max_chunks=settings.MAX_CHUNKS_PER_DOCUMENT
             )
+            chunk_rows.extend((document_id, i, chunk) for i, chunk in enumerate(chunks))
         
-        # 파일 크기 검증
-        file_content = await file.read()
-        if len(file_content) > settings.MAX_FILE_SIZE:
-            raise CustomAPIException(
-                f"파일 크기가 너무 큽니다. 최대 크기: {settings.MAX_FILE_SIZE // (1024*1024)}MB"
-            )
+        # 모든 문서의 청크를 한 번의 배치 호출로 임베딩
+        embeddings = get_embedding_generator().get_embeddings([chunk for _, _, chunk in chunk_rows], model_name)
         
-        # 텍스트 추출
-        if file_extension == ".pdf":
-            content = extract_text_from_pdf(file_content)
-        elif file_extension == ".docx":
-            content = extract_text_from_docx(file_content)
-        else:
-            raise CustomAPIException("지원하지 않는 파일 형식입니다.")
+        # 재임베딩 시 이전 청크를 교체 (청크가 저장되기 전까지는 검색 대상에서 제외됨)
+        db.execute(text("DELETE FROM document_chunks WHERE document_id = ANY(CAST(:ids AS uuid[]))"), {"ids": document_ids})
+        db.execute(text("""
+            INSERT INTO document_chunks (id, document_id, chunk_index, content, embedding, embedding_i8)
+            VALUES (:id, :document_id, :chunk_index, :content, CAST(:embedding AS halfvec), :embedding_i8)
+        """), [
+            {
+                "id": uuid.uuid4(),
+                "document_id": document_id,
+                "chunk_index": chunk_index,
+                "content": chunk,
+                "embedding": format_halfvec(embedding),
+                "embedding_i8": int8_quantizer.encode(db, embedding)
+            }
+            for (document_id, chunk_index, chunk), embedding in zip(chunk_rows, embeddings)
+        ])
+        set_embedding_status(db, document_ids, "completed")
+        # 검색 대상 문서가 바뀌었으므로 이전 검색 결과로 만든 캐시 답변 제거
+        db.query(QACacheModel).delete()
+        db.commit()
+        semantic_cache.clear()
         
-        if not content.strip():
-            raise CustomAPIException("파일에서 텍스트를 추출할 수 없습니다.")
+        # 보정 전에 빈 DB로 시작한 경우 청크가 충분히 쌓이면 INT8 보정 및 기존 청크 코드 채우기
+        if settings.QUANTIZATION == "int8" and not int8_quantizer.calibrated:
+            try:
+                int8_quantizer.ensure_calibrated(db)
+            except Exception as e:
+                db.rollback()
+                logger.error(f"Error calibrating INT8 quantizer: {e}")
         
-        # 임베딩 생성
-        embedding = embedding_generator.get_embedding(
-            content, 
-            settings.DEFAULT_EMBEDDING_MODEL
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error embedding documents {document_ids}: {e}")
+        # 실패 사유를 남겨 목록에서 확인하고 재임베딩할 수 있도록 함
+        try:
+            set_embedding_status(db, document_ids, "failed", str(e))
+            db.commit()
+        except Exception as status_error:
+            db.rollback()
+            logger.error(f"Error recording embedding failure for {document_ids}: {status_error}")
+    finally:
+        db.close()
+
+def embed_document(document_id: uuid.UUID, content: str, model_name: str):
+    """단일 문서 임베딩 (업로드 응답 후 백그라운드에서 실행)"""
+    embed_documents([(document_id, content)], model_name)
+
+async def extract_upload_text(file: UploadFile) -> Tuple[str, str]:
+    """업로드 파일 검증 후 (확장자, 추출 텍스트) 반환"""
+    # 파일 확장자 검증
+    file_extension = Path(file.filename).suffix.lower()
+    if file_extension not in settings.ALLOWED_EXTENSIONS_SET:
+        raise CustomAPIException(
+            f"지원하지 않는 파일 형식입니다. 지원 형식: {', '.join(settings.ALLOWED_EXTENSIONS)}"
         )
+    
+    # 파일 크기 검증 (제한을 넘으면 전체를 메모리에 올리기 전에 중단)
+    file_content = await read_upload(file)
+    
+    # 텍스트 추출
+    if file_extension == ".pdf":
+        content = extract_text_from_pdf(file_content)
+    elif file_extension == ".docx":
+        content = extract_text_from_docx(file_content)
+    else:
+        raise CustomAPIException("지원하지 않는 파일 형식입니다.")
+    
+    if not content.strip():
+        raise CustomAPIException("파일에서 텍스트를 추출할 수 없습니다.")
+    
+    return file_extension, content
+
+@router.post("/", status_code=202)
+async def upload_file(
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db)
+):
+    """파일 업로드 (임베딩은 응답 후 백그라운드에서 생성)"""
+    try:
+        file_extension, content = await extract_upload_text(file)
         
-        # 데이터베이스에 저장
+        # 데이터베이스에 저장 (임베딩 없이 먼저 저장)
         document = DocumentModel(
             id=uuid.uuid4(),
             filename=file.filename,
             filetype=file_extension,
-            content=content,
-            embedding=embedding
+            content=content
         )
         
         db.add(document)
         db.commit()
         db.refresh(document)
         
+        background_tasks.add_task(embed_document, document.id, content, settings.DEFAULT_EMBEDDING_MODEL)
+        
         return {
             "success": True,
             "message": "파일 업로드 완료",
@@ -99,7 +190,8 @@ async def upload_file(
                 "filename": document.filename,
                 "filetype": document.filetype,
                 "content_length": len(document.content),
-                "uploaded_at": document.uploaded_at.isoformat()
+                "uploaded_at": document.uploaded_at.isoformat(),
+                "embedding_status": "pending"
             }
         }
         
@@ -108,30 +200,131 @@ async def upload_file(
     except Exception as e:
         raise CustomAPIException(f"파일 업로드 중 오류가 발생했습니다: {str(e)}")
 
-@router.get("/")
-async def get_uploaded_files(db: Session = Depends(get_db)):
-    """업로드된 파일 목록 조회"""
+@router.post("/bulk", status_code=202)
+async def upload_files(
+    background_tasks: BackgroundTasks,
+    files: List[UploadFile] = File(...),
+    db: Session = Depends(get_db)
+):
+    """여러 파일 일괄 업로드 (단일 INSERT로 저장, 임베딩은 응답 후 한 번에 배치 생성)"""
     try:
-        documents = db.query(DocumentModel).order_by(DocumentModel.uploaded_at.desc()).all()
+        rows = []
+        for file in files:
+            try:
+                file_extension, content = await extract_upload_text(file)
+            except CustomAPIException as e:
+                raise CustomAPIException(f"{file.filename}: {e.message}")
+            rows.append({
+                "id": uuid.uuid4(),
+                "filename": file.filename,
+                "filetype": file_extension,
+                "content": content
+            })
+        
+        # ID는 클라이언트에서 생성하고 업로드 시각만 RETURNING으로 받아 재조회(refresh) 생략
+        result = db.execute(text("""
+            INSERT INTO documents (id, filename, filetype, content)
+            SELECT * FROM unnest(
+                CAST(:ids AS uuid[]), CAST(:filenames AS text[]),
+                CAST(:filetypes AS text[]), CAST(:contents AS text[])
+            )
+            RETURNING id, uploaded_at
+        """), {
+            "ids": [str(row["id"]) for row in rows],
+            "filenames": [row["filename"] for row in rows],
+            "filetypes": [row["filetype"] for row in rows],
+            "contents": [row["content"] for row in rows]
+        })
+        uploaded_at = {str(document_id): timestamp for document_id, timestamp in result}
+        db.commit()
+        
+        background_tasks.add_task(
+            embed_documents,
+            [(row["id"], row["content"]) for row in rows],
+            settings.DEFAULT_EMBEDDING_MODEL
+        )
         
         return {
             "success": True,
-            "message": "업로드된 파일 목록 조회 완료",
+            "message": f"{len(rows)}개 파일 업로드 완료",
             "data": [
                 {
-                    "id": str(doc.id),
-                    "filename": doc.filename,
-                    "filetype": doc.filetype,
-                    "content_length": len(doc.content),
-                    "uploaded_at": doc.uploaded_at.isoformat()
+                    "id": str(row["id"]),
+                    "filename": row["filename"],
+                    "filetype": row["filetype"],
+                    "content_length": len(row["content"]),
+                    "uploaded_at": uploaded_at[str(row["id"])].isoformat(),
+                    "embedding_status": "pending"
                 }
-                for doc in documents
+                for row in rows
             ]
         }
         
+    except CustomAPIException:
+        raise
+    except Exception as e:
+        db.rollback()
+        raise CustomAPIException(f"파일 일괄 업로드 중 오류가 발생했습니다: {str(e)}")
+
+@router.get("/")
+async def get_uploaded_files(db: Session = Depends(get_db)):
+    """업로드된 파일 목록 조회"""
+    try:
+        # 응답 JSON 전체를 DB에서 만들어 그대로 전달 (행별 ORM 객체/dict 생성 생략)
+        body = db.execute(text("""
+            SELECT CAST(json_build_object(
+                'success', true,
+                'message', CAST(:message AS text),
+                'data', COALESCE(json_agg(json_build_object(
+                    'id', id,
+                    'filename', filename,
+                    'filetype', filetype,
+                    'content_length', length(content),
+                    'uploaded_at', uploaded_at,
+                    'embedding_status', embedding_status,
+                    'embedding_error', embedding_error
+                ) ORDER BY uploaded_at DESC), '[]'::json)
+            ) AS text)
+            FROM documents
+        """), {"message": "업로드된 파일 목록 조회 완료"}).scalar()
+        
+        return Response(content=body, media_type="application/json")
+        
     except Exception as e:
         raise CustomAPIException(f"파일 목록 조회 중 오류가 발생했습니다: {str(e)}")
 
+@router.post("/{document_id}/embed", status_code=202)
+async def reembed_document(
+    document_id: str,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db)
+):
+    """문서 청크 임베딩 재생성 (임베딩 실패 문서 재시도, 응답 후 백그라운드에서 실행)"""
+    try:
+        document = db.query(DocumentModel).filter(DocumentModel.id == document_id).first()
+        if not document:
+            raise CustomAPIException("문서를 찾을 수 없습니다.")
+        
+        document.embedding_status = "pending"
+        document.embedding_error = None
+        db.commit()
+        
+        background_tasks.add_task(embed_document, document.id, document.content, settings.DEFAULT_EMBEDDING_MODEL)
+        
+        return {
+            "success": True,
+            "message": "임베딩 재생성 요청 완료",
+            "data": {
+                "id": str(document.id),
+                "embedding_status": document.embedding_status
+            }
+        }
+        
+    except CustomAPIException:
+        raise
+    except Exception as e:
+        raise CustomAPIException(f"임베딩 재생성 중 오류가 발생했습니다: {str(e)}")
+
 @router.delete("/{document_id}")
 async def delete_document(document_id: str, db: Session = Depends(get_db)):
     """업로드된 문서 삭제"""
@@ -141,7 +334,10 @@ async def delete_document(document_id: str, db: Session = Depends(get_db)):
             raise CustomAPIException("문서를 찾을 수 없습니다.")
         
         db.delete(document)
+        # 삭제된 문서를 근거로 한 캐시 답변이 재사용되지 않도록 시맨틱 캐시 비우기
+        db.query(QACacheModel).delete()
         db.commit()
+        semantic_cache.clear()
         
         return {
             "success": True,
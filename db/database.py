@@ -1,11 +1,40 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from backend.config import settings
 
-engine = create_engine(settings.DATABASE_URL)
+def _async_database_url() -> str:
+    """비동기 엔진용 URL (postgresql:// -> postgresql+asyncpg://)"""
+    if settings.ASYNC_DATABASE_URL:
+        return settings.ASYNC_DATABASE_URL
+    scheme, rest = settings.DATABASE_URL.split("://", 1)
+    return f"{scheme.split('+', 1)[0]}+asyncpg://{rest}"
+
+engine = create_engine(
+    settings.DATABASE_URL,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_pre_ping=True
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+@event.listens_for(engine, "connect")
+def _set_search_params(dbapi_connection, connection_record):
+    """새 커넥션마다 HNSW 탐색 후보 수 설정 (재현율/지연 시간 조절)"""
+    with dbapi_connection.cursor() as cursor:
+        cursor.execute(f"SET hnsw.ef_search = {int(settings.HNSW_EF_SEARCH)}")
+    dbapi_connection.commit()
+
+# 히스토리 조회 등 I/O 위주 엔드포인트용 비동기 엔진 (이벤트 루프를 막지 않음)
+async_engine = create_async_engine(
+    _async_database_url(),
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_pre_ping=True
+)
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 def get_db():
@@ -13,4 +42,8 @@ def get_db():
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,34 @@
+from sqlalchemy import text
+
+from backend.config import settings
+from backend.retrieval.quantization import int8_quantizer
+from db.database import engine, SessionLocal
+from db.models import Base
+from db.migrations import apply_schema_upgrades
+
+# INT8 검색 1단계(해밍 거리 후보 선택)가 전체 스캔 대신 사용하는 이진 양자화 HNSW 인덱스
+BINARY_HNSW_INDEX = """
+    CREATE INDEX IF NOT EXISTS document_chunks_embedding_bit_hnsw ON document_chunks
+    USING hnsw ((binary_quantize(embedding)::bit(1536)) bit_hamming_ops)
+"""
+
+def init_quantization():
+    """INT8 보정 범위 계산, 기존 청크 코드 채우기 및 1단계 검색 인덱스 생성"""
+    with engine.begin() as conn:
+        conn.execute(text(BINARY_HNSW_INDEX))
+
+    db = SessionLocal()
+    try:
+        int8_quantizer.ensure_calibrated(db)
+    finally:
+        db.close()
+
+def init_db():
+    """테이블 생성 및 스키마 변경 사항 적용 (배포 시 한 번 실행)"""
+    Base.metadata.create_all(bind=engine)
+    apply_schema_upgrades(engine)
+    if settings.QUANTIZATION == "int8":
+        init_quantization()
+
+if __name__ == "__main__":
+    init_db()
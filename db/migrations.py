@@ -0,0 +1,85 @@
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+# create_all은 기존 테이블에 컬럼/인덱스를 추가하지 않으므로 멱등 DDL로 보완
+SCHEMA_UPGRADES = [
+    "ALTER TABLE documents ADD COLUMN IF NOT EXISTS embedding_i8 BYTEA",
+    "CREATE INDEX IF NOT EXISTS ix_documents_uploaded_at_filetype ON documents (uploaded_at, filetype)",
+    "CREATE INDEX IF NOT EXISTS ix_queries_created_at ON queries (created_at)",
+    "CREATE INDEX IF NOT EXISTS ix_answers_question_id ON answers (question_id)",
+    "CREATE INDEX IF NOT EXISTS ix_documents_uploaded_at_id ON documents (uploaded_at, id)",
+    "CREATE INDEX IF NOT EXISTS ix_queries_created_at_id ON queries (created_at, id)",
+    # 기존 vector(1536) 임베딩 컬럼을 halfvec(1536)으로 변환 (vector_cosine_ops 인덱스는 먼저 제거)
+    """
+    DO $$
+    BEGIN
+        IF (SELECT format_type(atttypid, atttypmod) FROM pg_attribute
+            WHERE attrelid = 'documents'::regclass AND attname = 'embedding') = 'vector(1536)' THEN
+            DROP INDEX IF EXISTS documents_embedding_hnsw;
+            ALTER TABLE documents ALTER COLUMN embedding TYPE halfvec(1536) USING embedding::halfvec(1536);
+        END IF;
+        IF (SELECT format_type(atttypid, atttypmod) FROM pg_attribute
+            WHERE attrelid = 'document_chunks'::regclass AND attname = 'embedding') = 'vector(1536)' THEN
+            DROP INDEX IF EXISTS document_chunks_embedding_hnsw;
+            ALTER TABLE document_chunks ALTER COLUMN embedding TYPE halfvec(1536) USING embedding::halfvec(1536);
+        END IF;
+    END $$
+    """,
+    # <=> (코사인 거리) 정렬이 전체 스캔 대신 HNSW 그래프 탐색을 사용하도록 ANN 인덱스 생성
+    """
+    CREATE INDEX IF NOT EXISTS documents_embedding_hnsw ON documents
+    USING hnsw (embedding halfvec_cosine_ops) WITH (m = 16, ef_construction = 64)
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS document_chunks_embedding_hnsw ON document_chunks
+    USING hnsw (embedding halfvec_cosine_ops) WITH (m = 16, ef_construction = 64)
+    """,
+    # 청크가 없는 기존 문서는 문서 단위 임베딩을 단일 청크로 옮겨 검색 대상 유지
+    """
+    INSERT INTO document_chunks (id, document_id, chunk_index, content, embedding, embedding_i8)
+    SELECT gen_random_uuid(), d.id, 0, d.content, d.embedding, d.embedding_i8
+    FROM documents d
+    WHERE d.embedding IS NOT NULL
+      AND NOT EXISTS (SELECT 1 FROM document_chunks c WHERE c.document_id = d.id)
+    """,
+    # 청크 임베딩 상태 추가 (기존 문서는 청크 유무로 완료/실패 판단)
+    """
+    DO $$
+    BEGIN
+        IF NOT EXISTS (
+            SELECT 1 FROM information_schema.columns
+            WHERE table_name = 'documents' AND column_name = 'embedding_status'
+        ) THEN
+            ALTER TABLE documents ADD COLUMN embedding_status VARCHAR NOT NULL DEFAULT 'pending';
+            ALTER TABLE documents ADD COLUMN embedding_error TEXT;
+            UPDATE documents d SET embedding_status = CASE
+                WHEN EXISTS (SELECT 1 FROM document_chunks c WHERE c.document_id = d.id) THEN 'completed'
+                ELSE 'failed'
+            END;
+        END IF;
+    END $$
+    """,
+    "ALTER TABLE embedding_tests ALTER COLUMN topk_results DROP NOT NULL",
+    "ALTER TABLE embedding_tests ADD COLUMN IF NOT EXISTS content_preview TEXT",
+    # 질문 임베딩은 queries에만 저장 (응답 행의 중복 벡터 제거)
+    "ALTER TABLE answers DROP COLUMN IF EXISTS embedding",
+    # 고아 응답을 정리한 뒤 질문 삭제 시 응답이 함께 삭제되도록 외래 키 추가
+    """
+    DO $$
+    BEGIN
+        IF NOT EXISTS (
+            SELECT 1 FROM pg_constraint WHERE conname = 'answers_question_id_fkey'
+        ) THEN
+            DELETE FROM answers a WHERE NOT EXISTS (SELECT 1 FROM queries q WHERE q.id = a.question_id);
+            ALTER TABLE answers ADD CONSTRAINT answers_question_id_fkey
+                FOREIGN KEY (question_id) REFERENCES queries (id) ON DELETE CASCADE;
+        END IF;
+    END $$
+    """,
+]
+
+def apply_schema_upgrades(engine: Engine):
+    """기존 데이터베이스에 스키마 변경 사항 적용"""
+    with engine.begin() as conn:
+        for statement in SCHEMA_UPGRADES:
+            conn.execute(text(statement))
@@ -1,5 +1,6 @@
-from sqlalchemy import Column, String, Text, DateTime, Boolean, JSON, Integer
-from sqlalchemy.dialects.postgresql import UUID, VECTOR
+from sqlalchemy import Column, String, Text, DateTime, Boolean, JSON, Integer, LargeBinary, ForeignKey, Index
+from sqlalchemy.dialects.postgresql import UUID, ARRAY, REAL, JSONB
+from pgvector.sqlalchemy import Vector, HALFVEC
 from sqlalchemy.sql import func
 from db.database import Base
 import uuid
@@ -11,25 +12,46 @@ class Document(Base):
     filename = Column(String, nullable=False)
     filetype = Column(String, nullable=False)
     content = Column(Text, nullable=False)
-    embedding = Column(VECTOR(1536))  # Default OpenAI embedding dimension
+    embedding = Column(HALFVEC(1536))  # 레거시 문서 단위 임베딩 (검색은 document_chunks 사용)
+    embedding_i8 = Column(LargeBinary, nullable=True)  # 레거시 INT8 코드
+    embedding_status = Column(String, nullable=False, server_default="pending")  # "pending", "completed", "failed"
+    embedding_error = Column(Text, nullable=True)  # 청크 임베딩 실패 사유
     uploaded_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    __table_args__ = (
+        Index("ix_documents_uploaded_at_filetype", "uploaded_at", "filetype"),
+        Index("ix_documents_uploaded_at_id", "uploaded_at", "id"),
+    )
+
+class DocumentChunk(Base):
+    __tablename__ = "document_chunks"
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    document_id = Column(UUID(as_uuid=True), ForeignKey("documents.id", ondelete="CASCADE"), nullable=False, index=True)
+    chunk_index = Column(Integer, nullable=False)
+    content = Column(Text, nullable=False)
+    embedding = Column(HALFVEC(1536))  # FP16 저장 (float32 대비 행 크기/거리 계산 메모리 전송량 절반)
+    embedding_i8 = Column(LargeBinary, nullable=True)  # INT8 스칼라 양자화 코드
 
 class Query(Base):
     __tablename__ = "queries"
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     question = Column(Text, nullable=False)
-    embedding = Column(VECTOR(1536))
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    embedding = Column(Vector(1536))
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    
+    __table_args__ = (
+        Index("ix_queries_created_at_id", "created_at", "id"),
+    )
 
 class Answer(Base):
     __tablename__ = "answers"
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    question_id = Column(UUID(as_uuid=True), nullable=False)
+    question_id = Column(UUID(as_uuid=True), ForeignKey("queries.id", ondelete="CASCADE"), nullable=False, index=True)
     answer = Column(Text, nullable=False)
     is_positive = Column(Boolean, nullable=True)  # User feedback
-    embedding = Column(VECTOR(1536))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
 class EmbeddingTest(Base):
@@ -38,5 +60,33 @@ class EmbeddingTest(Base):
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     model_name = Column(String, nullable=False)
     question = Column(Text, nullable=False)
-    topk_results = Column(JSON, nullable=False)
-    created_at = Column(DateTime(timezone=True), server_default=func.now()) 
\ No newline at end of file
+    topk_results = Column(JSON, nullable=True)  # 레거시 결과 (모델별 결과는 embedding_test_results에 저장)
+    content_preview = Column(Text, nullable=True)  # 테스트 문서 앞부분 (최대 500자)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class EmbeddingTestResult(Base):
+    __tablename__ = "embedding_test_results"
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    test_id = Column(UUID(as_uuid=True), ForeignKey("embedding_tests.id", ondelete="CASCADE"), nullable=False, index=True)
+    model_name = Column(String, nullable=False)
+    status = Column(String, nullable=False)
+    top_k_json = Column(JSONB, nullable=True)  # 내용 미리보기로 축약된 상위 k개 결과
+    error = Column(Text, nullable=True)
+
+class QACache(Base):
+    __tablename__ = "qa_cache"
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    model_name = Column(String, nullable=False)
+    embedding = Column(LargeBinary, nullable=False)  # 정규화된 float32 질문 임베딩
+    answer_id = Column(UUID(as_uuid=True), ForeignKey("answers.id", ondelete="CASCADE"), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class EmbeddingCalibration(Base):
+    __tablename__ = "embedding_calibrations"
+    
+    model_name = Column(String, primary_key=True)
+    mins = Column(ARRAY(REAL), nullable=False)  # 차원별 최소값
+    scales = Column(ARRAY(REAL), nullable=False)  # 차원별 (max - min) / 255
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
\ No newline at end of file
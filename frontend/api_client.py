@@ -0,0 +1,105 @@
+import asyncio
+import threading
+from typing import Any, Dict, Optional, Tuple
+import httpx
+import orjson
+import requests
+import streamlit as st
+from cachetools import TTLCache
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# API 기본 URL
+API_BASE_URL = "http://localhost:8000"
+
+# (연결, 읽기) 타임아웃 초 - 목록/삭제 같은 짧은 JSON 요청
+DEFAULT_TIMEOUT = (2, 10)
+# 업로드, 임베딩 테스트, LLM 스트리밍처럼 서버 처리가 긴 요청
+LONG_TIMEOUT = (2, 120)
+
+# 같은 경로/파라미터의 GET 응답 캐시 유지 시간 (초)과 최대 항목 수
+CACHE_TTL = 30
+CACHE_MAX_ENTRIES = 256
+
+@st.cache_resource
+def get_session() -> requests.Session:
+    """모든 페이지가 공유하는 HTTP 세션 (keep-alive 커넥션 풀 재사용)"""
+    session = requests.Session()
+    # 재시도는 urllib3 기본값대로 멱등 메서드(GET/DELETE 등)에만 적용
+    adapter = HTTPAdapter(
+        pool_connections=10,
+        pool_maxsize=20,
+        max_retries=Retry(total=2, backoff_factor=0.2, status_forcelist=[502, 503, 504])
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+@st.cache_resource
+def _get_event_loop() -> asyncio.AbstractEventLoop:
+    """비동기 API 호출을 실행하는 백그라운드 이벤트 루프 (rerun 간 커넥션 유지)"""
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    return loop
+
+@st.cache_resource
+def get_async_client() -> httpx.AsyncClient:
+    """백그라운드 이벤트 루프에서 사용하는 공용 비동기 HTTP 클라이언트"""
+    return httpx.AsyncClient(
+        base_url=API_BASE_URL,
+        limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+        timeout=10
+    )
+
+def run_async(coro):
+    """코루틴을 백그라운드 이벤트 루프에서 실행하고 결과 대기"""
+    return asyncio.run_coroutine_threadsafe(coro, _get_event_loop()).result()
+
+# 모든 페이지와 세션이 공유 (만료/초과 항목은 TTLCache가 제거)
+_response_cache: TTLCache = TTLCache(maxsize=CACHE_MAX_ENTRIES, ttl=CACHE_TTL)
+_cache_lock = threading.Lock()
+
+# 진행 중인 동일 GET 요청 (백그라운드 이벤트 루프 스레드에서만 접근)
+_inflight: Dict[Tuple[str, tuple], "asyncio.Task"] = {}
+
+def _cache_key(path: str, params: Optional[Dict[str, Any]]) -> Tuple[str, tuple]:
+    return path, tuple(sorted((params or {}).items()))
+
+async def _fetch_json(key: Tuple[str, tuple], path: str, params: Optional[Dict[str, Any]]) -> Any:
+    response = await get_async_client().get(path, params=params)
+    response.raise_for_status()
+    data = orjson.loads(response.content)["data"]
+
+    with _cache_lock:
+        _response_cache[key] = data
+    return data
+
+async def get_json(path: str, params: Optional[Dict[str, Any]] = None) -> Any:
+    """GET 응답의 data 필드 (CACHE_TTL초간 캐시, 실패는 예외로 전달되어 캐시되지 않음)"""
+    key = _cache_key(path, params)
+    with _cache_lock:
+        if key in _response_cache:
+            return _response_cache[key]
+
+    # 연속 rerun으로 같은 요청이 겹치면 진행 중인 요청 하나의 결과를 함께 사용
+    task = _inflight.get(key)
+    if task is None:
+        task = _inflight[key] = asyncio.ensure_future(_fetch_json(key, path, params))
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+    # 한 호출자가 취소되어도 다른 호출자가 기다리는 요청은 계속 진행
+    return await asyncio.shield(task)
+
+def prefetch_json(path: str, params: Optional[Dict[str, Any]] = None):
+    """결과를 기다리지 않고 GET 요청을 시작해 응답 캐시를 미리 채움 (실패는 무시)"""
+    asyncio.run_coroutine_threadsafe(get_json(path, params), _get_event_loop())
+
+def seed_cache(path: str, params: Optional[Dict[str, Any]], data: Any):
+    """다른 응답에 함께 받은 데이터를 해당 경로/파라미터의 GET 응답 캐시에 저장"""
+    with _cache_lock:
+        _response_cache[_cache_key(path, params)] = data
+
+def clear_cache(prefix: str = ""):
+    """경로가 prefix로 시작하는 GET 응답 캐시 무효화"""
+    with _cache_lock:
+        for key in [key for key in _response_cache if key[0].startswith(prefix)]:
+            _response_cache.pop(key, None)
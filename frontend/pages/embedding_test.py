@@ -1,11 +1,15 @@
 import streamlit as st
-import requests
+import httpx
 import json
 from datetime import datetime
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 
+from frontend.api_client import (
+    API_BASE_URL, LONG_TIMEOUT, get_session, get_json, run_async, clear_cache
+)
+
 # 페이지 설정
 st.set_page_config(
     page_title="임베딩 테스트",
@@ -13,9 +17,6 @@ st.set_page_config(
     layout="wide"
 )
 
-# API 기본 URL
-API_BASE_URL = "http://localhost:8000"
-
 def test_embedding_with_file(file, question, model_names):
     """파일로 임베딩 테스트"""
     try:
@@ -24,13 +25,15 @@ def test_embedding_with_file(file, question, model_names):
             "question": question,
             "model_names": model_names
         }
-        response = requests.post(
+        response = get_session().post(
             f"{API_BASE_URL}/embedding-test/test-with-file",
             files=files,
-            data=data
+            data=data,
+            timeout=LONG_TIMEOUT
         )
         
         if response.status_code == 200:
+            clear_cache("/embedding-test/history")
             return response.json()
         else:
             st.error(f"테스트 실패: {response.text}")
@@ -46,9 +49,10 @@ def test_embedding_with_text(question, model_names):
             "question": question,
             "model_names": model_names
         }
-        response = requests.post(f"{API_BASE_URL}/embedding-test/test-with-text", json=data)
+        response = get_session().post(f"{API_BASE_URL}/embedding-test/test-with-text", json=data, timeout=LONG_TIMEOUT)
         
         if response.status_code == 200:
+            clear_cache("/embedding-test/history")
             return response.json()
         else:
             st.error(f"테스트 실패: {response.text}")
@@ -60,13 +64,10 @@ def test_embedding_with_text(question, model_names):
 def get_available_models():
     """사용 가능한 모델 목록 조회"""
     try:
-        response = requests.get(f"{API_BASE_URL}/embedding-test/available-models")
-        
-        if response.status_code == 200:
-            return response.json()["data"]
-        else:
-            st.error(f"모델 목록 조회 실패: {response.text}")
-            return {}
+        return run_async(get_json("/embedding-test/available-models"))
+    except httpx.HTTPStatusError as e:
+        st.error(f"모델 목록 조회 실패: {e.response.text}")
+        return {}
     except Exception as e:
         st.error(f"모델 목록 조회 중 오류 발생: {str(e)}")
         return {}
@@ -74,13 +75,10 @@ def get_available_models():
 def get_test_history():
     """테스트 히스토리 조회"""
     try:
-        response = requests.get(f"{API_BASE_URL}/embedding-test/history")
-        
-        if response.status_code == 200:
-            return response.json()["data"]
-        else:
-            st.error(f"히스토리 조회 실패: {response.text}")
-            return []
+        return run_async(get_json("/embedding-test/history"))
+    except httpx.HTTPStatusError as e:
+        st.error(f"히스토리 조회 실패: {e.response.text}")
+        return []
     except Exception as e:
         st.error(f"히스토리 조회 중 오류 발생: {str(e)}")
         return []
@@ -258,6 +256,7 @@ st.header("📚 테스트 히스토리")
 
 # 새로고침 버튼
 if st.button("🔄 히스토리 새로고침"):
+    clear_cache("/embedding-test/history")
     st.rerun()
 
 # 히스토리 조회
@@ -273,7 +272,8 @@ if history:
     display_df.columns = ["질문", "모델", "생성 날짜"]
     
     # 질문 길이 제한
-    display_df["질문"] = display_df["질문"].apply(lambda x: x[:50] + "..." if len(x) > 50 else x)
+    questions = display_df["질문"]
+    display_df["질문"] = questions.where(questions.str.len() <= 50, questions.str.slice(0, 50) + "...")
     
     st.dataframe(
         display_df,
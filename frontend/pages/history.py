@@ -1,10 +1,12 @@
 import streamlit as st
-import requests
-import json
+import httpx
 from datetime import datetime, timedelta
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
+import numpy as np
+
+from frontend.api_client import (
+    API_BASE_URL, DEFAULT_TIMEOUT, get_session, get_json, run_async, prefetch_json, seed_cache, clear_cache
+)
 
 # 페이지 설정
 st.set_page_config(
@@ -13,79 +15,93 @@ st.set_page_config(
     layout="wide"
 )
 
-# API 기본 URL
-API_BASE_URL = "http://localhost:8000"
+# 목록 기본 페이지 크기와 조회 기간 (일)
+DEFAULT_PAGE_SIZE = 20
+DEFAULT_DAYS = 30
 
-def get_document_history(limit=50, offset=0, filetype=None, date_from=None, date_to=None):
-    """문서 히스토리 조회"""
-    try:
-        params = {
-            "limit": limit,
-            "offset": offset
-        }
-        if filetype:
-            params["filetype"] = filetype
-        if date_from:
-            params["date_from"] = date_from
-        if date_to:
-            params["date_to"] = date_to
-            
-        response = requests.get(f"{API_BASE_URL}/history/documents", params=params)
-        
-        if response.status_code == 200:
-            return response.json()["data"]
-        else:
-            st.error(f"문서 히스토리 조회 실패: {response.text}")
-            return {"documents": [], "pagination": {}}
-    except Exception as e:
-        st.error(f"문서 히스토리 조회 중 오류 발생: {str(e)}")
-        return {"documents": [], "pagination": {}}
+def get_paging_state(name, filters):
+    """페이지별 커서 목록 (필터나 페이지 크기가 바뀌면 첫 페이지로 초기화)"""
+    key = f"{name}_paging"
+    if key not in st.session_state or st.session_state[key]["filters"] != filters:
+        st.session_state[key] = {"filters": filters, "cursors": [None], "total": None}
+    return st.session_state[key]
 
-def get_qa_history(limit=50, offset=0, feedback=None, date_from=None, date_to=None):
-    """질의응답 히스토리 조회"""
+def fetch_data(path, params, label, fallback):
+    """GET 응답 데이터 조회 (실패 시 오류를 표시하고 기본값 반환)"""
     try:
-        params = {
-            "limit": limit,
-            "offset": offset
-        }
-        if feedback is not None:
-            params["feedback"] = feedback
-        if date_from:
-            params["date_from"] = date_from
-        if date_to:
-            params["date_to"] = date_to
-            
-        response = requests.get(f"{API_BASE_URL}/history/qa", params=params)
-        
-        if response.status_code == 200:
-            return response.json()["data"]
-        else:
-            st.error(f"질의응답 히스토리 조회 실패: {response.text}")
-            return {"qa_history": [], "pagination": {}}
+        return run_async(get_json(path, params))
+    except httpx.HTTPStatusError as e:
+        st.error(f"{label} 실패: {e.response.text}")
     except Exception as e:
-        st.error(f"질의응답 히스토리 조회 중 오류 발생: {str(e)}")
-        return {"qa_history": [], "pagination": {}}
+        st.error(f"{label} 중 오류 발생: {str(e)}")
+    return fallback
+
+def build_list_params(limit, cursor, cursor_field, filters):
+    """목록 조회 파라미터 (값이 없는 필터는 제외, 커서가 있으면 그 이후 페이지)"""
+    params = {"limit": limit}
+    params.update({key: value for key, value in filters.items() if value is not None})
+    if cursor:
+        params[f"after_{cursor_field}"] = cursor[cursor_field]
+        params["after_id"] = cursor["id"]
+        if "answer_id" in cursor:
+            params["after_answer_id"] = cursor["answer_id"]
+    return params
+
+def default_date_range():
+    """날짜 필터 기본값 (최근 DEFAULT_DAYS일)"""
+    today = datetime.now().date()
+    return today - timedelta(days=DEFAULT_DAYS), today
+
+def build_document_filters(filetype_filter, date_from, date_to):
+    """문서 히스토리 필터 파라미터"""
+    return {
+        "filetype": filetype_filter if filetype_filter != "전체" else None,
+        "date_from": date_from.isoformat() if date_from else None,
+        "date_to": date_to.isoformat() if date_to else None
+    }
+
+def build_qa_filters(feedback_value, date_from, date_to):
+    """질의응답 히스토리 필터 파라미터"""
+    return {
+        "feedback": feedback_value,
+        "date_from": date_from.isoformat() if date_from else None,
+        "date_to": date_to.isoformat() if date_to else None
+    }
+
+def prefetch_history_bulk():
+    """첫 방문 시 통계와 기본 필터의 문서/질의응답 첫 페이지를 한 번의 요청으로 받아 각 조회 캐시에 저장"""
+    if st.session_state.get("history_bulk_loaded"):
+        return
+    st.session_state["history_bulk_loaded"] = True
 
-def get_statistics():
-    """통계 정보 조회"""
+    date_from, date_to = default_date_range()
+    doc_params = build_list_params(DEFAULT_PAGE_SIZE, None, "uploaded_at", build_document_filters("전체", date_from, date_to))
+    qa_params = build_list_params(DEFAULT_PAGE_SIZE, None, "created_at", build_qa_filters(None, date_from, date_to))
     try:
-        response = requests.get(f"{API_BASE_URL}/history/statistics")
-        
-        if response.status_code == 200:
-            return response.json()["data"]
-        else:
-            st.error(f"통계 정보 조회 실패: {response.text}")
-            return {}
-    except Exception as e:
-        st.error(f"통계 정보 조회 중 오류 발생: {str(e)}")
-        return {}
+        bulk = run_async(get_json("/history/bulk", {
+            "docs_limit": DEFAULT_PAGE_SIZE,
+            "qa_limit": DEFAULT_PAGE_SIZE,
+            "date_from": doc_params["date_from"],
+            "date_to": doc_params["date_to"],
+            "qa_date_from": qa_params["date_from"],
+            "qa_date_to": qa_params["date_to"]
+        }))
+    except Exception:
+        return  # 실패하면 각 탭이 자기 API를 직접 호출
+
+    # 탭 렌더링 함수가 기본 필터로 조회할 때와 같은 캐시 키로 저장
+    seed_cache("/history/statistics", None, bulk["statistics"])
+    seed_cache("/history/documents", doc_params, bulk["documents"])
+    seed_cache("/history/qa", qa_params, bulk["qa"])
 
 def delete_document(document_id):
     """문서 삭제"""
     try:
-        response = requests.delete(f"{API_BASE_URL}/history/documents/{document_id}")
+        response = get_session().delete(f"{API_BASE_URL}/history/documents/{document_id}", timeout=DEFAULT_TIMEOUT)
         
         if response.status_code == 200:
+            clear_cache("/history")
+            clear_cache("/upload")  # 업로드 페이지의 파일 목록 캐시도 무효화
             return True
         else:
             st.error(f"문서 삭제 실패: {response.text}")
@@ -97,9 +113,10 @@ def delete_document(document_id):
 def delete_qa(question_id):
     """질의응답 삭제"""
     try:
-        response = requests.delete(f"{API_BASE_URL}/history/qa/{question_id}")
+        response = get_session().delete(f"{API_BASE_URL}/history/qa/{question_id}", timeout=DEFAULT_TIMEOUT)
         
         if response.status_code == 200:
+            clear_cache("/history")
             return True
         else:
             st.error(f"질의응답 삭제 실패: {response.text}")
@@ -112,15 +129,19 @@ def delete_qa(question_id):
 st.title("📚 시스템 히스토리")
 st.markdown("업로드된 문서와 질의응답 기록을 관리하고 통계를 확인하세요.")
 
-# 탭 선택
-tab1, tab2, tab3 = st.tabs(["📊 통계 대시보드", "📄 문서 히스토리", "❓ 질의응답 히스토리"])
+# 선택한 탭의 내용만 실행해 해당 API만 호출 (st.tabs는 모든 탭 본문을 매번 실행)
+active_tab = st.radio(
+    "탭 선택",
+    ["📊 통계 대시보드", "📄 문서 히스토리", "❓ 질의응답 히스토리"],
+    horizontal=True,
+    label_visibility="collapsed"
+)
 
-# 통계 대시보드
-with tab1:
+def render_statistics():
+    """통계 대시보드"""
     st.header("📊 시스템 통계")
     
-    # 통계 정보 조회
-    stats = get_statistics()
+    stats = fetch_data("/history/statistics", None, "통계 정보 조회", {})
     
     if stats:
         # 전체 통계
@@ -149,12 +170,9 @@ with tab1:
         
         # 파일 타입별 차트
         if stats["documents"]["by_filetype"]:
-            fig_filetype = px.pie(
-                values=list(stats["documents"]["by_filetype"].values()),
-                names=list(stats["documents"]["by_filetype"].keys()),
-                title="파일 타입별 분포"
-            )
-            st.plotly_chart(fig_filetype, use_container_width=True)
+            # 값이 몇 개뿐이므로 plotly 대신 Streamlit 기본 차트 사용
+            st.caption("파일 타입별 분포")
+            st.bar_chart(stats["documents"]["by_filetype"])
         
         # 질의응답 통계
         st.subheader("❓ 질의응답 통계")
@@ -175,19 +193,13 @@ with tab1:
                 "미평가": stats["qa"]["total_answers"] - stats["qa"]["positive_feedback"] - stats["qa"]["negative_feedback"]
             }
             
-            fig_feedback = px.bar(
-                x=list(feedback_data.keys()),
-                y=list(feedback_data.values()),
-                title="피드백 분포",
-                color=list(feedback_data.keys()),
-                color_discrete_map={"긍정": "green", "부정": "red", "미평가": "gray"}
-            )
-            st.plotly_chart(fig_feedback, use_container_width=True)
+            st.caption("피드백 분포")
+            st.bar_chart(feedback_data)
     else:
         st.warning("통계 정보를 불러올 수 없습니다.")
 
-# 문서 히스토리
-with tab2:
+def render_documents():
+    """문서 히스토리"""
     st.header("📄 문서 히스토리")
     
     # 필터 옵션
@@ -203,40 +215,44 @@ with tab2:
     with col2:
         date_from = st.date_input(
             "시작 날짜",
-            value=datetime.now() - timedelta(days=30),
+            value=default_date_range()[0],
             help="조회할 시작 날짜를 선택하세요."
         )
     
     with col3:
         date_to = st.date_input(
             "종료 날짜",
-            value=datetime.now(),
+            value=default_date_range()[1],
             help="조회할 종료 날짜를 선택하세요."
         )
     
-    # 페이징
-    col1, col2 = st.columns([3, 1])
-    with col1:
-        limit = st.slider("페이지당 항목 수", 10, 100, 20)
-    with col2:
-        page = st.number_input("페이지", min_value=1, value=1)
-    
+    # 페이징 (offset 대신 이전 페이지 마지막 항목 커서로 다음 페이지 조회)
+    limit = st.slider("페이지당 항목 수", 10, 100, DEFAULT_PAGE_SIZE)
+    doc_paging = get_paging_state("doc", (filetype_filter, date_from, date_to, limit))
+    page = len(doc_paging["cursors"])
     offset = (page - 1) * limit
     
     # 문서 히스토리 조회
-    doc_history = get_document_history(
-        limit=limit,
-        offset=offset,
-        filetype=filetype_filter if filetype_filter != "전체" else None,
-        date_from=date_from.isoformat() if date_from else None,
-        date_to=date_to.isoformat() if date_to else None
+    filters = build_document_filters(filetype_filter, date_from, date_to)
+    doc_history = fetch_data(
+        "/history/documents",
+        build_list_params(limit, doc_paging["cursors"][-1], "uploaded_at", filters),
+        "문서 히스토리 조회",
+        {"documents": [], "pagination": {}}
     )
     
+    # 다음 페이지를 미리 요청해 캐시에 올려 두어 "다음 페이지" 클릭 시 바로 표시
+    if doc_history["pagination"].get("has_more"):
+        prefetch_json(
+            "/history/documents",
+            build_list_params(limit, doc_history["pagination"]["next_cursor"], "uploaded_at", filters)
+        )
+    
     if doc_history["documents"]:
         # 데이터프레임으로 표시
         df_docs = pd.DataFrame(doc_history["documents"])
         df_docs["업로드 날짜"] = pd.to_datetime(df_docs["uploaded_at"]).dt.strftime("%Y-%m-%d %H:%M")
-        df_docs["파일 크기"] = df_docs["content_length"].apply(lambda x: f"{x:,} 문자")
+        df_docs["파일 크기"] = df_docs["content_length"].map("{:,} 문자".format)
         
         # 표시할 컬럼만 선택
         display_df = df_docs[["filename", "filetype", "파일 크기", "업로드 날짜"]].copy()
@@ -251,17 +267,21 @@ with tab2:
         # 페이징 정보
         pagination = doc_history["pagination"]
         if pagination:
-            st.write(f"총 {pagination['total']}개 항목 중 {offset + 1}-{min(offset + limit, pagination['total'])}번째 표시")
+            # 전체 개수는 첫 페이지 응답에만 포함되므로 보관해 두고 사용
+            if pagination["total"] is not None:
+                doc_paging["total"] = pagination["total"]
+            shown_to = offset + len(doc_history["documents"])
+            if doc_paging["total"] is not None:
+                st.write(f"총 {doc_paging['total']}개 항목 중 {offset + 1}-{shown_to}번째 표시")
+            else:
+                st.write(f"{offset + 1}-{shown_to}번째 표시")
             
+            # 클릭 콜백은 다음 실행 전에 커서를 바꾸므로 이전 커서로 한 번 더 조회하지 않음
             if pagination["has_more"]:
-                if st.button("다음 페이지"):
-                    st.session_state.page = page + 1
-                    st.rerun()
+                st.button("다음 페이지", on_click=doc_paging["cursors"].append, args=(pagination["next_cursor"],))
             
             if page > 1:
-                if st.button("이전 페이지"):
-                    st.session_state.page = page - 1
-                    st.rerun()
+                st.button("이전 페이지", on_click=doc_paging["cursors"].pop)
         
         # 문서 삭제 기능
         st.subheader("🗑️ 문서 삭제")
@@ -280,8 +300,8 @@ with tab2:
     else:
         st.info("📝 해당 조건에 맞는 문서가 없습니다.")
 
-# 질의응답 히스토리
-with tab3:
+def render_qa():
+    """질의응답 히스토리"""
     st.header("❓ 질의응답 히스토리")
     
     # 필터 옵션
@@ -297,7 +317,7 @@ with tab3:
     with col2:
         qa_date_from = st.date_input(
             "시작 날짜",
-            value=datetime.now() - timedelta(days=30),
+            value=default_date_range()[0],
             key="qa_date_from",
             help="조회할 시작 날짜를 선택하세요."
         )
@@ -305,46 +325,54 @@ with tab3:
     with col3:
         qa_date_to = st.date_input(
             "종료 날짜",
-            value=datetime.now(),
+            value=default_date_range()[1],
             key="qa_date_to",
             help="조회할 종료 날짜를 선택하세요."
         )
     
-    # 페이징
-    col1, col2 = st.columns([3, 1])
-    with col1:
-        qa_limit = st.slider("페이지당 항목 수", 10, 100, 20, key="qa_limit")
-    with col2:
-        qa_page = st.number_input("페이지", min_value=1, value=1, key="qa_page")
-    
-    qa_offset = (qa_page - 1) * qa_limit
-    
     # 피드백 필터 변환
     feedback_map = {"긍정": True, "부정": False, "미평가": None, "전체": None}
     feedback_value = feedback_map[feedback_filter]
     
+    # 페이징 (offset 대신 이전 페이지 마지막 항목 커서로 다음 페이지 조회)
+    qa_limit = st.slider("페이지당 항목 수", 10, 100, DEFAULT_PAGE_SIZE, key="qa_limit")
+    qa_paging = get_paging_state("qa", (feedback_filter, qa_date_from, qa_date_to, qa_limit))
+    qa_page = len(qa_paging["cursors"])
+    qa_offset = (qa_page - 1) * qa_limit
+    
     # 질의응답 히스토리 조회
-    qa_history = get_qa_history(
-        limit=qa_limit,
-        offset=qa_offset,
-        feedback=feedback_value,
-        date_from=qa_date_from.isoformat() if qa_date_from else None,
-        date_to=qa_date_to.isoformat() if qa_date_to else None
+    filters = build_qa_filters(feedback_value, qa_date_from, qa_date_to)
+    qa_history = fetch_data(
+        "/history/qa",
+        build_list_params(qa_limit, qa_paging["cursors"][-1], "created_at", filters),
+        "질의응답 히스토리 조회",
+        {"qa_history": [], "pagination": {}}
     )
     
+    # 다음 페이지를 미리 요청해 캐시에 올려 두어 "다음 페이지" 클릭 시 바로 표시
+    if qa_history["pagination"].get("has_more"):
+        prefetch_json(
+            "/history/qa",
+            build_list_params(qa_limit, qa_history["pagination"]["next_cursor"], "created_at", filters)
+        )
+    
     if qa_history["qa_history"]:
         # 데이터프레임으로 표시
         df_qa = pd.DataFrame(qa_history["qa_history"])
         df_qa["생성 날짜"] = pd.to_datetime(df_qa["created_at"]).dt.strftime("%Y-%m-%d %H:%M")
-        df_qa["피드백"] = df_qa["is_positive"].apply(lambda x: "👍" if x else "👎" if x is False else "❓")
+        df_qa["피드백"] = np.select(
+            [df_qa["is_positive"].eq(True), df_qa["is_positive"].eq(False)], ["👍", "👎"], default="❓"
+        )
         
         # 표시할 컬럼만 선택
         display_df = df_qa[["question", "answer", "피드백", "생성 날짜"]].copy()
         display_df.columns = ["질문", "답변", "피드백", "생성 날짜"]
         
         # 질문과 답변 길이 제한
-        display_df["질문"] = display_df["질문"].apply(lambda x: x[:50] + "..." if len(x) > 50 else x)
-        display_df["답변"] = display_df["답변"].apply(lambda x: x[:100] + "..." if len(x) > 100 else x)
+        questions = display_df["질문"]
+        display_df["질문"] = questions.where(questions.str.len() <= 50, questions.str.slice(0, 50) + "...")
+        answers = display_df["답변"]
+        display_df["답변"] = answers.where(answers.str.len() <= 100, answers.str.slice(0, 100) + "...")
         
         st.dataframe(
             display_df,
@@ -355,17 +383,22 @@ with tab3:
         # 페이징 정보
         pagination = qa_history["pagination"]
         if pagination:
-            st.write(f"총 {pagination['total']}개 항목 중 {qa_offset + 1}-{min(qa_offset + qa_limit, pagination['total'])}번째 표시")
+            # 전체 개수는 첫 페이지 응답에만 포함되므로 보관해 두고 사용
+            if pagination["total"] is not None:
+                qa_paging["total"] = pagination["total"]
+            qa_shown_to = qa_offset + len(qa_history["qa_history"])
+            if qa_paging["total"] is not None:
+                st.write(f"총 {qa_paging['total']}개 항목 중 {qa_offset + 1}-{qa_shown_to}번째 표시")
+            else:
+                st.write(f"{qa_offset + 1}-{qa_shown_to}번째 표시")
             
+            # 클릭 콜백은 다음 실행 전에 커서를 바꾸므로 이전 커서로 한 번 더 조회하지 않음
             if pagination["has_more"]:
-                if st.button("다음 페이지", key="qa_next"):
-                    st.session_state.qa_page = qa_page + 1
-                    st.rerun()
+                st.button("다음 페이지", key="qa_next", on_click=qa_paging["cursors"].append,
+                          args=(pagination["next_cursor"],))
             
             if qa_page > 1:
-                if st.button("이전 페이지", key="qa_prev"):
-                    st.session_state.qa_page = qa_page - 1
-                    st.rerun()
+                st.button("이전 페이지", key="qa_prev", on_click=qa_paging["cursors"].pop)
         
         # 질의응답 삭제 기능
         st.subheader("🗑️ 질의응답 삭제")
@@ -384,6 +417,16 @@ with tab3:
     else:
         st.info("📝 해당 조건에 맞는 질의응답이 없습니다.")
 
+# 첫 방문에는 세 탭의 기본 데이터를 일괄 조회로 한 번에 받아 두어 탭 전환 시 바로 표시
+prefetch_history_bulk()
+
+if active_tab == "📊 통계 대시보드":
+    render_statistics()
+elif active_tab == "📄 문서 히스토리":
+    render_documents()
+else:
+    render_qa()
+
 # 사이드바에 도움말
 with st.sidebar:
     st.header("💡 도움말")
@@ -405,4 +448,6 @@ with st.sidebar:
     
     # 새로고침 버튼
     if st.button("🔄 전체 새로고침"):
+        st.cache_data.clear()
+        clear_cache()
         st.rerun() 
\ No newline at end of file
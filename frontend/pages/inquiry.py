@@ -1,8 +1,14 @@
 import streamlit as st
-import requests
+import httpx
 import json
 from datetime import datetime
+from collections import Counter
 import pandas as pd
+import numpy as np
+
+from frontend.api_client import (
+    API_BASE_URL, DEFAULT_TIMEOUT, LONG_TIMEOUT, get_session, get_json, run_async, clear_cache
+)
 
 # 페이지 설정
 st.set_page_config(
@@ -11,34 +17,46 @@ st.set_page_config(
     layout="wide"
 )
 
-# API 기본 URL
-API_BASE_URL = "http://localhost:8000"
-
-def ask_question(question, model_name="text-embedding-ada-002"):
-    """질문 API 호출"""
+def stream_question(question, model_name, state):
+    """질문 스트리밍 API 호출 (답변 토큰을 순서대로 반환하고 meta/done/error 이벤트는 state에 저장)"""
     try:
         data = {
             "question": question,
             "model_name": model_name
         }
-        response = requests.post(f"{API_BASE_URL}/qa/ask", json=data)
-        
-        if response.status_code == 200:
-            return response.json()
-        else:
-            st.error(f"질문 처리 실패: {response.text}")
-            return None
+        # 압축되면 토큰이 버퍼링되므로 원본 그대로 수신
+        headers = {"Accept": "text/event-stream", "Accept-Encoding": "identity"}
+        with get_session().post(f"{API_BASE_URL}/qa/ask/stream", json=data, headers=headers, stream=True, timeout=LONG_TIMEOUT) as response:
+            if response.status_code != 200:
+                state["error"] = response.text
+                return
+            
+            response.encoding = "utf-8"
+            event = None
+            for line in response.iter_lines(decode_unicode=True):
+                if line.startswith("event: "):
+                    event = line[len("event: "):]
+                elif line.startswith("data: "):
+                    payload = json.loads(line[len("data: "):])
+                    if event == "token":
+                        yield payload["content"]
+                    elif event == "error":
+                        state["error"] = payload["message"]
+                    else:
+                        state[event] = payload
     except Exception as e:
-        st.error(f"질문 처리 중 오류 발생: {str(e)}")
-        return None
+        state["error"] = str(e)
 
 def update_feedback(answer_id, is_positive):
     """피드백 업데이트"""
     try:
         data = {"is_positive": is_positive}
-        response = requests.patch(f"{API_BASE_URL}/qa/answers/{answer_id}", json=data)
+        response = get_session().patch(f"{API_BASE_URL}/qa/answers/{answer_id}", json=data, timeout=DEFAULT_TIMEOUT)
         
         if response.status_code == 200:
+            # 피드백이 표시되는 히스토리/통계 캐시 무효화
+            clear_cache("/qa/history")
+            clear_cache("/history")
             return True
         else:
             st.error(f"피드백 업데이트 실패: {response.text}")
@@ -50,13 +68,10 @@ def update_feedback(answer_id, is_positive):
 def get_qa_history():
     """질의응답 히스토리 조회"""
     try:
-        response = requests.get(f"{API_BASE_URL}/qa/history")
-        
-        if response.status_code == 200:
-            return response.json()["data"]
-        else:
-            st.error(f"히스토리 조회 실패: {response.text}")
-            return []
+        return run_async(get_json("/qa/history"))
+    except httpx.HTTPStatusError as e:
+        st.error(f"히스토리 조회 실패: {e.response.text}")
+        return []
     except Exception as e:
         st.error(f"히스토리 조회 중 오류 발생: {str(e)}")
         return []
@@ -94,55 +109,57 @@ question = st.text_area(
 # 질문 제출
 if st.button("🔍 질문하기", type="primary", disabled=not question.strip()):
     if question.strip():
-        with st.spinner("질문을 처리하고 답변을 생성하는 중..."):
-            result = ask_question(question, selected_model)
+        # 답변 내용 (토큰이 도착하는 대로 표시)
+        st.subheader("🤖 AI 답변")
+        stream_state = {}
+        st.write_stream(stream_question(question, selected_model, stream_state))
+        
+        if "done" in stream_state:
+            data = stream_state["done"]
+            # 새 질의응답이 저장되었으므로 히스토리/통계 캐시 무효화
+            clear_cache("/qa/history")
+            clear_cache("/history")
+            
+            st.success("✅ 답변 생성 완료!")
+            
+            # 관련 문서 정보
+            # 답변 아래 목록이 길어지지 않도록 하나의 접힌 영역에 모아 표시 (expander는 중첩 불가)
+            relevant_documents = data.get("relevant_documents")
+            if relevant_documents:
+                with st.expander(f"📄 관련 문서 ({len(relevant_documents)}개)", expanded=False):
+                    for i, doc in enumerate(relevant_documents, 1):
+                        st.markdown(f"**문서 {i}: {doc['filename']}** (유사도: {doc['similarity']:.3f})")
+                        st.caption(doc["content_preview"])
+            
+            # 피드백 버튼
+            st.subheader("💬 답변 평가")
+            col1, col2 = st.columns(2)
+            
+            with col1:
+                if st.button("👍 좋아요", key="positive"):
+                    if update_feedback(data["answer_id"], True):
+                        st.success("피드백이 저장되었습니다!")
+            
+            with col2:
+                if st.button("👎 개선 필요", key="negative"):
+                    if update_feedback(data["answer_id"], False):
+                        st.success("피드백이 저장되었습니다!")
             
-            if result and result.get("success"):
-                data = result["data"]
-                
-                # 답변 표시
-                st.success("✅ 답변 생성 완료!")
-                
-                # 답변 내용
-                st.subheader("🤖 AI 답변")
-                st.write(data["answer"])
-                
-                # 관련 문서 정보
-                if data.get("relevant_documents"):
-                    st.subheader("📄 관련 문서")
-                    for i, doc in enumerate(data["relevant_documents"], 1):
-                        with st.expander(f"문서 {i}: {doc['filename']} (유사도: {doc['similarity']:.3f})"):
-                            st.write(doc["content_preview"])
-                
-                # 피드백 버튼
-                st.subheader("💬 답변 평가")
-                col1, col2 = st.columns(2)
-                
-                with col1:
-                    if st.button("👍 좋아요", key="positive"):
-                        if update_feedback(data["answer_id"], True):
-                            st.success("피드백이 저장되었습니다!")
-                
-                with col2:
-                    if st.button("👎 개선 필요", key="negative"):
-                        if update_feedback(data["answer_id"], False):
-                            st.success("피드백이 저장되었습니다!")
-                
-                # 세션에 최근 답변 저장
-                if "recent_answers" not in st.session_state:
-                    st.session_state.recent_answers = []
-                
-                st.session_state.recent_answers.insert(0, {
-                    "question": data["question"],
-                    "answer": data["answer"],
-                    "model": selected_model,
-                    "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                })
-                
-                # 최근 5개만 유지
-                st.session_state.recent_answers = st.session_state.recent_answers[:5]
-            else:
-                st.error("❌ 질문 처리 실패")
+            # 세션에 최근 답변 저장
+            if "recent_answers" not in st.session_state:
+                st.session_state.recent_answers = []
+            
+            st.session_state.recent_answers.insert(0, {
+                "question": data["question"],
+                "answer": data["answer"],
+                "model": selected_model,
+                "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            })
+            
+            # 최근 5개만 유지
+            st.session_state.recent_answers = st.session_state.recent_answers[:5]
+        else:
+            st.error(f"❌ 질문 처리 실패: {stream_state.get('error', '응답이 중단되었습니다.')}")
 
 # 최근 답변 표시
 if "recent_answers" in st.session_state and st.session_state.recent_answers:
@@ -159,6 +176,7 @@ st.header("📚 질의응답 히스토리")
 
 # 새로고침 버튼
 if st.button("🔄 히스토리 새로고침"):
+    clear_cache("/qa/history")
     st.rerun()
 
 # 히스토리 조회
@@ -168,15 +186,19 @@ if history:
     # 데이터프레임으로 표시
     df = pd.DataFrame(history)
     df["생성 날짜"] = pd.to_datetime(df["created_at"]).dt.strftime("%Y-%m-%d %H:%M")
-    df["피드백"] = df["is_positive"].apply(lambda x: "👍" if x else "👎" if x is False else "❓")
+    df["피드백"] = np.select(
+        [df["is_positive"].eq(True), df["is_positive"].eq(False)], ["👍", "👎"], default="❓"
+    )
     
     # 표시할 컬럼만 선택
     display_df = df[["question", "answer", "피드백", "생성 날짜"]].copy()
     display_df.columns = ["질문", "답변", "피드백", "생성 날짜"]
     
     # 질문과 답변 길이 제한
-    display_df["질문"] = display_df["질문"].apply(lambda x: x[:50] + "..." if len(x) > 50 else x)
-    display_df["답변"] = display_df["답변"].apply(lambda x: x[:100] + "..." if len(x) > 100 else x)
+    questions = display_df["질문"]
+    display_df["질문"] = questions.where(questions.str.len() <= 50, questions.str.slice(0, 50) + "...")
+    answers = display_df["답변"]
+    display_df["답변"] = answers.where(answers.str.len() <= 100, answers.str.slice(0, 100) + "...")
     
     st.dataframe(
         display_df,
@@ -188,13 +210,16 @@ if history:
     st.subheader("📊 히스토리 통계")
     col1, col2, col3, col4 = st.columns(4)
     
+    # 피드백별 개수를 한 번의 순회로 집계
+    feedback_counts = Counter(h["is_positive"] for h in history)
+    positive_count = feedback_counts[True]
+    negative_count = feedback_counts[False]
+    
     with col1:
         st.metric("총 질문 수", len(history))
     with col2:
-        positive_count = len([h for h in history if h["is_positive"] is True])
         st.metric("긍정 피드백", positive_count)
     with col3:
-        negative_count = len([h for h in history if h["is_positive"] is False])
         st.metric("부정 피드백", negative_count)
     with col4:
         feedback_rate = (positive_count + negative_count) / len(history) * 100 if history else 0
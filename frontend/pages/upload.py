@@ -1,8 +1,14 @@
 import streamlit as st
-import requests
+import httpx
 import json
 from datetime import datetime
+from collections import Counter
 import pandas as pd
+from requests_toolbelt import MultipartEncoder
+
+from frontend.api_client import (
+    API_BASE_URL, DEFAULT_TIMEOUT, LONG_TIMEOUT, get_session, get_json, run_async, clear_cache
+)
 
 # 페이지 설정
 st.set_page_config(
@@ -11,16 +17,24 @@ st.set_page_config(
     layout="wide"
 )
 
-# API 기본 URL
-API_BASE_URL = "http://localhost:8000"
-
 def upload_file(file):
     """파일 업로드 API 호출"""
     try:
-        files = {"file": file}
-        response = requests.post(f"{API_BASE_URL}/upload/", files=files)
+        # 멀티파트 본문을 메모리에 한 번에 만들지 않고 청크 단위로 스트리밍 전송
+        encoder = MultipartEncoder(
+            fields={"file": (file.name, file, file.type or "application/octet-stream")}
+        )
+        response = get_session().post(
+            f"{API_BASE_URL}/upload/",
+            data=encoder,
+            headers={"Content-Type": encoder.content_type},
+            timeout=LONG_TIMEOUT
+        )
         
-        if response.status_code == 200:
+        # 202: 저장 완료, 임베딩은 서버에서 백그라운드로 생성 중
+        if response.status_code in (200, 202):
+            clear_cache("/upload")
+            clear_cache("/history")  # 문서 히스토리/통계 캐시도 무효화
             return response.json()
         else:
             st.error(f"업로드 실패: {response.text}")
@@ -30,15 +44,12 @@ def upload_file(file):
         return None
 
 def get_uploaded_files():
-    """업로드된 파일 목록 조회"""
+    """업로드된 파일 목록 조회 (모든 페이지가 공유하는 GET 응답 캐시 사용)"""
     try:
-        response = requests.get(f"{API_BASE_URL}/upload/")
-        
-        if response.status_code == 200:
-            return response.json()["data"]
-        else:
-            st.error(f"파일 목록 조회 실패: {response.text}")
-            return []
+        return run_async(get_json("/upload/"))
+    except httpx.HTTPStatusError as e:
+        st.error(f"파일 목록 조회 실패: {e.response.text}")
+        return []
     except Exception as e:
         st.error(f"파일 목록 조회 중 오류 발생: {str(e)}")
         return []
@@ -46,9 +57,11 @@ def get_uploaded_files():
 def delete_file(file_id):
     """파일 삭제"""
     try:
-        response = requests.delete(f"{API_BASE_URL}/upload/{file_id}")
+        response = get_session().delete(f"{API_BASE_URL}/upload/{file_id}", timeout=DEFAULT_TIMEOUT)
         
         if response.status_code == 200:
+            clear_cache("/upload")
+            clear_cache("/history")  # 문서 히스토리/통계 캐시도 무효화
             return True
         else:
             st.error(f"삭제 실패: {response.text}")
@@ -57,6 +70,21 @@ def delete_file(file_id):
         st.error(f"삭제 중 오류 발생: {str(e)}")
         return False
 
+def reembed_file(file_id):
+    """임베딩 재생성 요청"""
+    try:
+        response = get_session().post(f"{API_BASE_URL}/upload/{file_id}/embed", timeout=DEFAULT_TIMEOUT)
+        
+        if response.status_code in (200, 202):
+            clear_cache("/upload")
+            return True
+        else:
+            st.error(f"임베딩 재생성 실패: {response.text}")
+            return False
+    except Exception as e:
+        st.error(f"임베딩 재생성 중 오류 발생: {str(e)}")
+        return False
+
 # 메인 UI
 st.title("📄 문서 업로드")
 st.markdown("PDF 또는 DOCX 파일을 업로드하여 AI 질의 시스템에 추가하세요.")
@@ -81,12 +109,14 @@ if uploaded_file is not None:
     
     # 업로드 버튼
     if st.button("📤 파일 업로드", type="primary"):
-        with st.spinner("파일을 업로드하고 임베딩을 생성하는 중..."):
+        with st.spinner("파일을 업로드하는 중..."):
             result = upload_file(uploaded_file)
             
             if result and result.get("success"):
-                st.success("✅ 파일 업로드 완료!")
-                st.json(result["data"])
+                st.success("✅ 파일 업로드 완료! 임베딩은 백그라운드에서 생성되며, 완료 후 검색에 반영됩니다.")
+                # 응답 상세는 접힌 상태로 표시 (필요할 때만 펼쳐 확인)
+                with st.expander("세부 정보", expanded=False):
+                    st.json(result["data"], expanded=False)
             else:
                 st.error("❌ 파일 업로드 실패")
 
@@ -95,6 +125,7 @@ st.header("📋 업로드된 파일 목록")
 
 # 새로고침 버튼
 if st.button("🔄 목록 새로고침"):
+    clear_cache("/upload")
     st.rerun()
 
 # 파일 목록 조회
@@ -104,11 +135,12 @@ if files:
     # 데이터프레임으로 표시
     df = pd.DataFrame(files)
     df["업로드 날짜"] = pd.to_datetime(df["uploaded_at"]).dt.strftime("%Y-%m-%d %H:%M")
-    df["파일 크기"] = df["content_length"].apply(lambda x: f"{x:,} 문자")
+    df["파일 크기"] = df["content_length"].map("{:,} 문자".format)
+    df["임베딩"] = df["embedding_status"].map({"pending": "⏳ 생성 중", "completed": "✅ 완료", "failed": "❌ 실패"})
     
     # 표시할 컬럼만 선택
-    display_df = df[["filename", "filetype", "파일 크기", "업로드 날짜"]].copy()
-    display_df.columns = ["파일명", "타입", "크기", "업로드 날짜"]
+    display_df = df[["filename", "filetype", "파일 크기", "임베딩", "업로드 날짜"]].copy()
+    display_df.columns = ["파일명", "타입", "크기", "임베딩", "업로드 날짜"]
     
     st.dataframe(
         display_df,
@@ -116,6 +148,23 @@ if files:
         hide_index=True
     )
     
+    # 임베딩 실패 파일 재시도 (실패한 파일은 검색 결과에 나타나지 않음)
+    failed_files = [f for f in files if f["embedding_status"] == "failed"]
+    if failed_files:
+        st.subheader("🔁 임베딩 재시도")
+        file_to_reembed = st.selectbox(
+            "임베딩에 실패한 파일을 선택하세요",
+            options=[(f["id"], f["filename"], f["embedding_error"]) for f in failed_files],
+            format_func=lambda x: x[1]
+        )
+        if file_to_reembed[2]:
+            st.caption(f"실패 사유: {file_to_reembed[2]}")
+        
+        if st.button("임베딩 재시도"):
+            if reembed_file(file_to_reembed[0]):
+                st.success("✅ 임베딩 재생성을 요청했습니다. 완료 후 검색에 반영됩니다.")
+                st.rerun()
+    
     # 파일 삭제 기능
     st.subheader("🗑️ 파일 삭제")
     file_to_delete = st.selectbox(
@@ -135,16 +184,20 @@ if files:
     st.subheader("📊 업로드 통계")
     col1, col2, col3, col4 = st.columns(4)
     
+    # 파일 타입별 개수와 총 문자 수를 한 번의 순회로 집계
+    filetype_counts = Counter()
+    total_chars = 0
+    for f in files:
+        filetype_counts[f["filetype"]] += 1
+        total_chars += f["content_length"]
+    
     with col1:
         st.metric("총 파일 수", len(files))
     with col2:
-        pdf_count = len([f for f in files if f["filetype"] == ".pdf"])
-        st.metric("PDF 파일", pdf_count)
+        st.metric("PDF 파일", filetype_counts[".pdf"])
     with col3:
-        docx_count = len([f for f in files if f["filetype"] == ".docx"])
-        st.metric("DOCX 파일", docx_count)
+        st.metric("DOCX 파일", filetype_counts[".docx"])
     with col4:
-        total_chars = sum(f["content_length"] for f in files)
         st.metric("총 문자 수", f"{total_chars:,}")
         
 else:
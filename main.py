@@ -1,5 +1,8 @@
+import os
+import logging
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from fastapi.exceptions import RequestValidationError
 from sqlalchemy.exc import SQLAlchemyError
 
@@ -15,33 +18,49 @@ from backend.core.exception_handler import (
     sqlalchemy_exception_handler,
     CustomAPIException
 )
-from db.database import engine
-from db.models import Base
+from backend.core.middleware import SelectiveGZipMiddleware
+from backend.retrieval import get_embedding_generator
+from backend.config import settings
+from db.init import init_db
 
-# 데이터베이스 테이블 생성
-Base.metadata.create_all(bind=engine)
+# 데이터베이스 테이블 생성 (스키마 조회 왕복이 기동을 늦추므로 RUN_DB_INIT일 때만, 평소에는 배포 시 python -m db.init)
+if settings.RUN_DB_INIT:
+    init_db()
 
 app = FastAPI(
     title="Q-Chatbot API",
     description="AI 기반 문서 질의 시스템 API",
-    version="1.0.0"
+    version="1.0.0",
+    # 목록 응답 직렬화를 표준 json 대신 orjson(C 구현)으로 처리
+    default_response_class=ORJSONResponse
 )
 
 # CORS 설정
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],  # 프로덕션에서는 특정 도메인으로 제한
+    allow_origins=settings.CORS_ORIGINS,
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST", "PATCH", "DELETE"],
+    allow_headers=["Content-Type", "Authorization"],
+    max_age=settings.CORS_MAX_AGE,
 )
 
+# 1KB 이상 응답 gzip 압축 (긴 답변이 포함된 히스토리 목록의 전송량 감소)
+# SSE 스트림은 gzip 버퍼에 토큰이 묶이지 않도록 Accept-Encoding과 관계없이 압축 제외
+app.add_middleware(SelectiveGZipMiddleware, minimum_size=1024, exclude_paths=["/qa/ask/stream"])
+
 # 예외 핸들러 등록
 app.add_exception_handler(Exception, global_exception_handler)
 app.add_exception_handler(CustomAPIException, custom_api_exception_handler)
 app.add_exception_handler(RequestValidationError, validation_exception_handler)
 app.add_exception_handler(SQLAlchemyError, sqlalchemy_exception_handler)
 
+@app.on_event("startup")
+async def preload_embedding_models():
+    """설정된 임베딩 모델을 요청 전에 미리 로드"""
+    if settings.HF_PRELOAD_MODELS:
+        get_embedding_generator().preload(settings.HF_PRELOAD_MODELS)
+
 # 라우터 등록
 app.include_router(upload_router)
 app.include_router(qa_router)
@@ -79,4 +98,24 @@ async def health_check():
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000) 
\ No newline at end of file
+    # 스키마 초기화는 위에서 이 프로세스가 한 번 실행했으므로 워커들은 건너뜀
+    # (같은 프로세스에서 main을 다시 import해도 캐시된 settings를 쓰므로 환경 변수와 함께 끔)
+    os.environ["RUN_DB_INIT"] = "false"
+    settings.RUN_DB_INIT = False
+    # 시맨틱 캐시는 프로세스 메모리에 있어 워커 간 무효화/임계값 변경이 공유되지 않음
+    workers = settings.WEB_WORKERS
+    if workers > 1 and settings.SEMANTIC_CACHE_ENABLED:
+        logging.getLogger(__name__).warning(
+            "WEB_WORKERS > 1 is not supported while the semantic cache is enabled; starting a single worker"
+        )
+        workers = 1
+    # 워커 여러 개는 앱을 import 문자열로 넘겨야 하고, 워커 1개는 앱을 다시 만들지 않도록 객체를 그대로 전달
+    # loop/http "auto"는 설치된 uvloop/httptools 사용
+    uvicorn.run(
+        "main:app" if workers > 1 else app,
+        host="0.0.0.0",
+        port=8000,
+        workers=workers,
+        loop="auto",
+        http="auto"
+    ) 
\ No newline at end of file